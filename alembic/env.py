@@ -31,6 +31,19 @@ if config.config_file_name is not None:
 # để hỗ trợ 'autogenerate'
 target_metadata = Base.metadata
 
+# Các đối tượng chỉ có ở Postgres, tạo bằng migration và không map trong models.py
+# (ví dụ cột generated tsvector). Bỏ qua để autogenerate không sinh lệnh drop.
+UNMAPPED_SCHEMA_OBJECTS = {
+    ("column", "search_vector"),
+    ("index", "ix_todos_owner_id_search_vector"),
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None and (type_, name) in UNMAPPED_SCHEMA_OBJECTS:
+        return False
+    return True
+
 
 def run_migrations_offline() -> None:
     """Chạy migration ở chế độ 'offline'."""
@@ -38,6 +51,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -49,7 +63,8 @@ def do_run_migrations(connection) -> None:
     """Cấu hình và chạy migration."""
     context.configure(
         connection=connection,
-        target_metadata=target_metadata
+        target_metadata=target_metadata,
+        include_object=include_object
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,28 @@
+"""Add todo stats version
+
+Revision ID: 2290db5d7d68
+Revises: 414214bd3c09
+Create Date: 2026-10-18 16:12:05.671834
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2290db5d7d68'
+down_revision: Union[str, Sequence[str], None] = '414214bd3c09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('todo_stats', sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('todo_stats', 'version')
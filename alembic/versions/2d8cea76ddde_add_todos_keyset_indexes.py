@@ -0,0 +1,30 @@
+"""Add todos keyset pagination indexes
+
+Revision ID: 2d8cea76ddde
+Revises: fbc1c9cc4138
+Create Date: 2026-10-18 10:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8cea76ddde'
+down_revision: Union[str, Sequence[str], None] = 'fbc1c9cc4138'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_owner_id_id', 'todos', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_todos_owner_id_priority_id', 'todos', ['owner_id', 'priority', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_owner_id_priority_id', table_name='todos')
+    op.drop_index('ix_todos_owner_id_id', table_name='todos')
@@ -0,0 +1,39 @@
+"""Add users search indexes
+
+Revision ID: 34d4816bcd1b
+Revises: d8f66f4d1493
+Create Date: 2026-10-18 14:52:09.316470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '34d4816bcd1b'
+down_revision: Union[str, Sequence[str], None] = 'd8f66f4d1493'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tìm theo tiền tố: lower(col) LIKE 'abc%' dùng được index B-tree text_pattern_ops với mọi collation
+    op.execute('CREATE INDEX ix_users_username_lower_pattern ON users (lower(username) text_pattern_ops)')
+    op.execute('CREATE INDEX ix_users_email_lower_pattern ON users (lower(email) text_pattern_ops)')
+    # Tìm chuỗi con: col ILIKE '%abc%' dùng index GIN trigram
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_users_username_trgm', 'users', ['username'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+    op.create_index('ix_users_email_trgm', 'users', ['email'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_trgm', table_name='users', postgresql_using='gin')
+    op.drop_index('ix_users_username_trgm', table_name='users', postgresql_using='gin')
+    op.drop_index('ix_users_email_lower_pattern', table_name='users')
+    op.drop_index('ix_users_username_lower_pattern', table_name='users')
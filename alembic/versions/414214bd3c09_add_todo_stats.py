@@ -0,0 +1,59 @@
+"""Add todo stats
+
+Revision ID: 414214bd3c09
+Revises: 34d4816bcd1b
+Create Date: 2026-10-18 15:31:47.820961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '414214bd3c09'
+down_revision: Union[str, Sequence[str], None] = '34d4816bcd1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'todo_stats',
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('priority_1', sa.Integer(), nullable=False),
+        sa.Column('priority_2', sa.Integer(), nullable=False),
+        sa.Column('priority_3', sa.Integer(), nullable=False),
+        sa.Column('priority_4', sa.Integer(), nullable=False),
+        sa.Column('priority_5', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('owner_id'),
+    )
+    # Tính một lần cho dữ liệu sẵn có; sau đó bảng được cập nhật cùng với mỗi lần ghi todos
+    op.execute("""
+        INSERT INTO todo_stats (owner_id, total, completed, priority_1, priority_2, priority_3,
+                                priority_4, priority_5, updated_at)
+        SELECT owner_id, count(*),
+               count(*) FILTER (WHERE complete),
+               count(*) FILTER (WHERE priority = 1),
+               count(*) FILTER (WHERE priority = 2),
+               count(*) FILTER (WHERE priority = 3),
+               count(*) FILTER (WHERE priority = 4),
+               count(*) FILTER (WHERE priority = 5),
+               now() AT TIME ZONE 'utc'
+        FROM todos
+        WHERE owner_id IN (SELECT id FROM users)
+        GROUP BY owner_id
+    """)
+    op.create_index('ix_todo_stats_total_owner_id', 'todo_stats', ['total', 'owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_stats_total_owner_id', table_name='todo_stats')
+    op.drop_table('todo_stats')
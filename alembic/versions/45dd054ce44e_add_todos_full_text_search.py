@@ -0,0 +1,40 @@
+"""Add todos full-text search
+
+Revision ID: 45dd054ce44e
+Revises: ada62e362fbd
+Create Date: 2026-10-18 12:08:44.120357
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45dd054ce44e'
+down_revision: Union[str, Sequence[str], None] = 'ada62e362fbd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gin cho phép đặt owner_id chung một index GIN với tsvector,
+    # để tìm kiếm trong danh sách của một người dùng không phải lọc kết quả của mọi người dùng khác
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    op.add_column('todos', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))",
+                    persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_todos_owner_id_search_vector', 'todos', ['owner_id', 'search_vector'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_owner_id_search_vector', table_name='todos', postgresql_using='gin')
+    op.drop_column('todos', 'search_vector')
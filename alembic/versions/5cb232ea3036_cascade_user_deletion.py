@@ -0,0 +1,43 @@
+"""Cascade user deletion
+
+Revision ID: 5cb232ea3036
+Revises: 2290db5d7d68
+Create Date: 2026-10-18 17:04:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5cb232ea3036'
+down_revision: Union[str, Sequence[str], None] = '2290db5d7d68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Khoá ngoại được tạo không đặt tên nên mang tên mặc định của Postgres
+FOREIGN_KEYS = (
+    ('todos_owner_id_fkey', 'todos', 'owner_id'),
+    ('password_reset_tokens_user_id_fkey', 'password_reset_tokens', 'user_id'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('deletion_requested_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_users_deletion_requested_at', 'users', ['deletion_requested_at'],
+                    postgresql_where=sa.text('deletion_requested_at IS NOT NULL'))
+    for name, table, column in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, 'users', [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, column in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, 'users', [column], ['id'])
+    op.drop_index('ix_users_deletion_requested_at', table_name='users')
+    op.drop_column('users', 'deletion_requested_at')
@@ -0,0 +1,36 @@
+"""Add todos filter indexes
+
+Revision ID: ada62e362fbd
+Revises: e119e7f303ba
+Create Date: 2026-10-18 11:32:05.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ada62e362fbd'
+down_revision: Union[str, Sequence[str], None] = 'e119e7f303ba'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lọc theo complete/priority với sort bất kỳ theo priority
+    op.create_index('ix_todos_owner_id_complete_priority_id', 'todos',
+                    ['owner_id', 'complete', 'priority', 'id'], unique=False,
+                    postgresql_include=['title', 'description'])
+    # Danh sách việc chưa xong (view mặc định phổ biến nhất) sort theo id
+    op.create_index('ix_todos_owner_id_id_open', 'todos', ['owner_id', 'id'], unique=False,
+                    postgresql_include=['title', 'description', 'priority'],
+                    postgresql_where=sa.text('complete = false'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_owner_id_id_open', table_name='todos')
+    op.drop_index('ix_todos_owner_id_complete_priority_id', table_name='todos')
@@ -0,0 +1,52 @@
+"""Hash password reset tokens
+
+Revision ID: d8f66f4d1493
+Revises: 45dd054ce44e
+Create Date: 2026-10-18 14:20:31.508112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f66f4d1493'
+down_revision: Union[str, Sequence[str], None] = '45dd054ce44e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Mỗi người dùng chỉ giữ token mới nhất, để tạo được unique constraint trên user_id
+    op.execute("""
+        DELETE FROM password_reset_tokens old
+        USING password_reset_tokens newer
+        WHERE old.user_id = newer.user_id AND old.id < newer.id
+    """)
+    # Token đang còn hiệu lực vẫn dùng được sau khi chuyển sang lưu hash
+    op.add_column('password_reset_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    op.execute("UPDATE password_reset_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column('password_reset_tokens', 'token_hash', nullable=False)
+    op.drop_index('ix_password_reset_tokens_token', table_name='password_reset_tokens')
+    op.drop_column('password_reset_tokens', 'token')
+
+    op.create_index(op.f('ix_password_reset_tokens_token_hash'), 'password_reset_tokens', ['token_hash'],
+                    unique=True)
+    op.create_index(op.f('ix_password_reset_tokens_expires_at'), 'password_reset_tokens', ['expires_at'],
+                    unique=False)
+    op.create_unique_constraint('uq_password_reset_tokens_user_id', 'password_reset_tokens', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Không khôi phục được token gốc từ hash: các token đang chờ bị huỷ
+    op.execute("DELETE FROM password_reset_tokens")
+    op.drop_constraint('uq_password_reset_tokens_user_id', 'password_reset_tokens', type_='unique')
+    op.drop_index(op.f('ix_password_reset_tokens_expires_at'), table_name='password_reset_tokens')
+    op.drop_index(op.f('ix_password_reset_tokens_token_hash'), table_name='password_reset_tokens')
+    op.drop_column('password_reset_tokens', 'token_hash')
+    op.add_column('password_reset_tokens', sa.Column('token', sa.String(), nullable=False))
+    op.create_index('ix_password_reset_tokens_token', 'password_reset_tokens', ['token'], unique=True)
@@ -0,0 +1,58 @@
+"""
+Benchmark HTTP cho các router của ứng dụng (auth, todos, admin).
+
+Ví dụ:
+    uv run --group dev python -m benchmarks --users 50 --todos-per-user 500 --duration 30 --output bench.json
+
+Mặc định benchmark chạy hoàn toàn offline với SQLite (aiosqlite) trong benchmarks/benchmark.db.
+Dùng --database-url để trỏ tới một Postgres local. Chỉ các bản ghi bench_* do benchmark tạo ra
+mới bị xóa khi seed lại.
+
+--transport http (mặc định) chạy app bằng uvicorn trong tiến trình con và gửi request qua TCP;
+--transport asgi gọi app trực tiếp trong cùng tiến trình (không có chi phí mạng).
+Kết quả (throughput, p50/p95/p99 theo route) được in ra dạng JSON để so sánh giữa các commit.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from benchmarks.environment import DEFAULT_DATABASE_URL, configure_environment
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--users", type=int, default=20, help="Số người dùng được seed")
+    parser.add_argument("--todos-per-user", type=int, default=200, help="Số todo seed cho mỗi người dùng")
+    parser.add_argument("--concurrency", type=int, default=16, help="Số client ảo chạy song song")
+    parser.add_argument("--duration", type=float, default=20.0, help="Thời gian đo (giây)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Thời gian chạy trước khi bắt đầu đo (giây)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed cho bộ sinh số ngẫu nhiên")
+    parser.add_argument("--transport", choices=("http", "asgi"), default="http")
+    parser.add_argument("--workers", type=int, default=1, help="Số worker uvicorn (chỉ với --transport http)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bcrypt-rounds", type=int, default=None,
+                        help="Ghi đè BCRYPT_ROUNDS (mặc định giữ cấu hình hiện tại)")
+    parser.add_argument("--output", default=None, help="Ghi kết quả JSON ra file thay vì stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args.database_url, args.bcrypt_rounds)
+
+    from benchmarks.runner import run_benchmark
+    report = asyncio.run(run_benchmark(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(PROJECT_ROOT, 'benchmarks', 'benchmark.db')}"
+
+# Các biến bắt buộc của Config; benchmark không gửi email thật nên giá trị giả là đủ
+BENCHMARK_ENVIRONMENT = {
+    "SECRET_KEY": "benchmark-secret-key",
+    "EMAIL_ADDRESS": "benchmark@example.com",
+    "EMAIL_PASSWORD": "",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "8025",
+    "SMTP_SECURITY": "none",
+    "EMAIL_SENDER_ENABLED": "false",
+    # Benchmark đăng nhập liên tục từ một IP; giới hạn tốc độ sẽ làm sai lệch kết quả
+    "RATE_LIMIT_ENABLED": "false",
+    "DEFAULT_ADMIN_USERNAME": "bench_admin",
+    "DEFAULT_ADMIN_EMAIL": "bench_admin@example.com",
+    "DEFAULT_ADMIN_FIRST_NAME": "Bench",
+    "DEFAULT_ADMIN_LAST_NAME": "Admin",
+    "DEFAULT_ADMIN_PASSWORD": "benchmark-password",
+    "DEFAULT_ADMIN_PHONE_NUMBER": "0000000000",
+}
+
+
+def configure_environment(database_url: str, bcrypt_rounds: int | None = None):
+    # Phải chạy trước khi import bất kỳ module nào của app (config.settings được tạo lúc import)
+    os.environ["DATABASE_URL"] = database_url
+    for key, value in BENCHMARK_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    if bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+
+    # main.py mount static/ và templates/ theo đường dẫn tương đối
+    os.chdir(PROJECT_ROOT)
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,51 @@
+import math
+import subprocess
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], errors: int, status_codes: dict, duration: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(recorder, duration: float, meta: dict) -> dict:
+    routes = {
+        route: summarize(latencies, recorder.errors[route], recorder.status_codes[route], duration)
+        for route, latencies in sorted(recorder.latencies.items())
+    }
+    all_latencies = [value for latencies in recorder.latencies.values() for value in latencies]
+    all_status_codes: dict[int, int] = {}
+    for codes in recorder.status_codes.values():
+        for code, count in codes.items():
+            all_status_codes[code] = all_status_codes.get(code, 0) + count
+
+    return {
+        "meta": {"git_revision": git_revision(), **meta},
+        "total": summarize(all_latencies, sum(recorder.errors.values()), all_status_codes, duration),
+        "routes": routes,
+    }
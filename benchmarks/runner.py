@@ -0,0 +1,122 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from config import settings
+from database import async_engine
+from benchmarks.environment import PROJECT_ROOT
+from benchmarks.report import build_report
+from benchmarks.seed import seed_database
+from benchmarks.traffic import Recorder, VirtualUser, login, run_virtual_user
+
+# Đăng nhập ban đầu chạy bcrypt; giới hạn song song để không bị pool hash từ chối (503)
+LOGIN_CONCURRENCY = 4
+SERVER_START_TIMEOUT = 30.0
+
+
+@asynccontextmanager
+async def asgi_client(concurrency: int):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            yield client
+
+
+@asynccontextmanager
+async def http_client(concurrency: int, port: int, workers: int):
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=os.environ.copy())
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await _wait_until_ready(client, process)
+            yield client
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with code {process.returncode}")
+        try:
+            response = await client.get("/auth/login-page")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Benchmark server did not become ready in time")
+
+
+async def run_benchmark(args) -> dict:
+    if args.users < 1:
+        raise SystemExit("--users must be at least 1")
+
+    rng = random.Random(args.seed)
+    users, admin_username = await seed_database(args.users, args.todos_per_user)
+    # Server (tiến trình con hoặc app ASGI) tự mở kết nối của nó
+    await async_engine.dispose()
+
+    if args.transport == "asgi":
+        client_context = asgi_client(args.concurrency)
+    else:
+        client_context = http_client(args.concurrency, args.port, args.workers)
+
+    recorder = Recorder()
+    try:
+        async with client_context as client:
+            login_slots = asyncio.Semaphore(LOGIN_CONCURRENCY)
+
+            async def login_limited(username: str) -> str:
+                async with login_slots:
+                    return await login(client, username)
+
+            admin_token = await login_limited(admin_username)
+            tokens = await asyncio.gather(*(login_limited(user.username) for user in users))
+            virtual_users = [VirtualUser(users[i % len(users)], tokens[i % len(users)])
+                             for i in range(args.concurrency)]
+
+            deadline = time.monotonic() + args.warmup + args.duration
+            tasks = [
+                asyncio.create_task(run_virtual_user(client, vu, admin_token, random.Random(rng.random()),
+                                                     deadline, recorder))
+                for vu in virtual_users
+            ]
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+            measure_start = time.perf_counter()
+            await asyncio.gather(*tasks)
+            measured = time.perf_counter() - measure_start
+    finally:
+        await async_engine.dispose()
+
+    return build_report(recorder, measured, {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "database": make_url(args.database_url).render_as_string(hide_password=True),
+        "transport": args.transport,
+        "workers": args.workers if args.transport == "http" else 1,
+        "users": args.users,
+        "todos_per_user": args.todos_per_user,
+        "concurrency": args.concurrency,
+        "duration_s": round(measured, 3),
+        "warmup_s": args.warmup,
+        "seed": args.seed,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+    })
@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import select, delete, insert, literal
+
+from database import async_engine, AsyncSessionLocal, Base
+from models import Users, Todos, TodoStats
+from modules.todos_modules.todo_crud import TODO_STATS_COUNTS
+from modules.auth_modules.auth_utils import get_password_hash
+
+BENCH_PREFIX = "bench_"
+BENCH_PASSWORD = "benchmark-password"
+BENCH_ADMIN_USERNAME = "bench_admin"
+
+# Số dòng mỗi câu lệnh INSERT khi seed
+SEED_CHUNK_SIZE = 1000
+
+
+@dataclass
+class SeededUser:
+    id: int
+    username: str
+    todo_ids: list[int] = field(default_factory=list)
+
+
+def _user_row(username: str, role: str, hashed_password: str) -> dict:
+    return {
+        "username": username,
+        "email": f"{username}@example.com",
+        "first_name": "Bench",
+        "last_name": username,
+        "hashed_password": hashed_password,
+        "is_active": True,
+        "role": role,
+        "phone_number": None,
+    }
+
+
+async def seed_database(users: int, todos_per_user: int) -> tuple[list[SeededUser], str]:
+    """
+    Tạo bảng (nếu chưa có), xóa dữ liệu bench_* cũ rồi seed người dùng và todos.
+    Trả về (danh sách người dùng thường, username của admin).
+    """
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Mọi tài khoản dùng chung một mật khẩu nên chỉ cần hash một lần
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+
+    async with AsyncSessionLocal() as db:
+        bench_user_ids = select(Users.id).filter(Users.username.startswith(BENCH_PREFIX))
+        await db.execute(delete(Todos).filter(Todos.owner_id.in_(bench_user_ids)))
+        await db.execute(delete(TodoStats).filter(TodoStats.owner_id.in_(bench_user_ids)))
+        await db.execute(delete(Users).filter(Users.username.startswith(BENCH_PREFIX)))
+
+        rows = [_user_row(f"{BENCH_PREFIX}user_{i}", "user", hashed_password) for i in range(users)]
+        rows.append(_user_row(BENCH_ADMIN_USERNAME, "admin", hashed_password))
+        result = await db.execute(insert(Users).returning(Users.id, Users.username, Users.role), rows)
+        seeded = [SeededUser(id=row.id, username=row.username) for row in result if row.role == "user"]
+
+        todo_rows = [{
+            "title": f"Benchmark todo {n}",
+            "description": f"Seeded todo {n} for {user.username}",
+            "priority": n % 5 + 1,
+            "complete": n % 3 == 0,
+            "owner_id": user.id,
+        } for user in seeded for n in range(todos_per_user)]
+        for start in range(0, len(todo_rows), SEED_CHUNK_SIZE):
+            await db.execute(insert(Todos), todo_rows[start:start + SEED_CHUNK_SIZE])
+        # Todos được insert thẳng, không qua todo_crud: tạo thống kê (và version cho ETag) như dữ liệu thật
+        counts = (
+            select(Todos.owner_id, *TODO_STATS_COUNTS.values(), literal(1), literal(datetime.utcnow()))
+            .filter(Todos.owner_id.in_([user.id for user in seeded]))
+            .group_by(Todos.owner_id)
+        )
+        await db.execute(insert(TodoStats).from_select(
+            ['owner_id', *TODO_STATS_COUNTS, 'version', 'updated_at'], counts
+        ))
+        await db.commit()
+
+        by_id = {user.id: user for user in seeded}
+        result = await db.execute(
+            select(Todos.id, Todos.owner_id).filter(Todos.owner_id.in_(list(by_id))).order_by(Todos.id)
+        )
+        for todo_id, owner_id in result:
+            by_id[owner_id].todo_ids.append(todo_id)
+
+    return seeded, BENCH_ADMIN_USERNAME
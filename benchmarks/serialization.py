@@ -0,0 +1,113 @@
+"""
+Micro-benchmark chi phí đọc và serialize danh sách todo, tính theo ms cho mỗi 1.000 todo.
+
+Ví dụ:
+    uv run --group dev python -m benchmarks.serialization --todos 1000 --repeat 200
+
+So sánh cách cũ (instance ORM + jsonable_encoder + json của thư viện chuẩn, như khi endpoint
+không có response_model) với cách hiện tại (dict dựng từ tuple cột + response_model + orjson).
+Dữ liệu nằm trong SQLite in-memory nên số đo chủ yếu là chi phí CPU phía Python.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.environment import DEFAULT_DATABASE_URL, configure_environment
+
+
+def _measure(func, repeat: int) -> float:
+    """Trả về thời gian chạy trung vị (giây) của func qua `repeat` lần."""
+    func()  # warmup
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run(todos: int, repeat: int) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.orm import Session
+
+    from database import Base
+    from models import Users, Todos
+    from modules.todos_modules.todo_crud import TODO_COLUMNS, _rows_to_dicts
+    from modules.todos_modules.todo_schemas import TodoListResponse
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Users.__table__, Todos.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Users), [{"id": 1, "username": "bench", "email": "bench@example.com",
+                                      "hashed_password": "-", "is_active": True, "role": "user"}])
+        conn.execute(insert(Todos), [
+            {"title": f"Todo {i}", "description": f"Description for todo number {i}",
+             "priority": i % 5 + 1, "complete": i % 3 == 0, "owner_id": 1}
+            for i in range(todos)
+        ])
+
+    adapter = TypeAdapter(TodoListResponse)
+    session = Session(engine)
+
+    def load_orm():
+        todo_models = session.execute(select(Todos).filter(Todos.owner_id == 1)).scalars().all()
+        session.expunge_all()
+        return todo_models
+
+    def load_columns():
+        return _rows_to_dicts(session.execute(select(*TODO_COLUMNS).filter(Todos.owner_id == 1)))
+
+    todo_models = load_orm()
+    todo_dicts = load_columns()
+
+    def serialize_before():
+        # FastAPI không có response_model: jsonable_encoder duyệt từng thuộc tính của instance ORM
+        return JSONResponse(jsonable_encoder({"todos": todo_models, "next_cursor": None})).body
+
+    def serialize_after():
+        # FastAPI có response_model: validate + dump bằng pydantic-core, rồi orjson
+        value = adapter.validate_python({"todos": todo_dicts, "next_cursor": None})
+        return ORJSONResponse(adapter.dump_python(value, mode="json")).body
+
+    assert json.loads(serialize_before()) == json.loads(serialize_after())
+
+    per_thousand = 1000 / todos * 1000  # giây -> ms cho mỗi 1.000 todo
+    phases = {
+        "load": (_measure(load_orm, repeat), _measure(load_columns, repeat)),
+        "serialize": (_measure(serialize_before, repeat), _measure(serialize_after, repeat)),
+    }
+    phases["total"] = tuple(sum(values) for values in zip(*phases.values()))
+
+    session.close()
+    engine.dispose()
+    return {
+        "todos": todos,
+        "repeat": repeat,
+        "ms_per_1000_todos": {
+            phase: {
+                "before": round(before * per_thousand, 3),
+                "after": round(after * per_thousand, 3),
+                "speedup": round(before / after, 2) if after else None,
+            }
+            for phase, (before, after) in phases.items()
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--todos", type=int, default=1000, help="Số todo trong danh sách được serialize")
+    parser.add_argument("--repeat", type=int, default=200, help="Số lần đo cho mỗi phép thử")
+    args = parser.parse_args(argv)
+
+    configure_environment(DEFAULT_DATABASE_URL)
+    print(json.dumps(run(args.todos, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
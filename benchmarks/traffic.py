@@ -0,0 +1,105 @@
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+import httpx
+
+from benchmarks.seed import SeededUser, BENCH_PASSWORD
+
+# Tỉ lệ các loại request trong traffic hỗn hợp: (tên route, trọng số)
+TRAFFIC_MIX = (
+    ("POST /auth/token", 5),
+    ("GET /todos/", 40),
+    ("POST /todos/todo", 20),
+    ("PUT /todos/todo/{todo_id}", 15),
+    ("DELETE /todos/todo/{todo_id}", 10),
+    ("GET /admin/users", 10),
+)
+
+
+@dataclass
+class VirtualUser:
+    user: SeededUser
+    token: str
+
+
+class Recorder:
+    """Ghi lại latency và status code theo route; bỏ qua các request trước khi hết warmup."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.status_codes: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def record(self, route: str, elapsed: float, status_code: int | None):
+        if not self.recording:
+            return
+        self.latencies[route].append(elapsed)
+        if status_code is None:
+            self.errors[route] += 1
+        else:
+            self.status_codes[route][status_code] += 1
+            if status_code >= 400:
+                self.errors[route] += 1
+
+
+async def login(client: httpx.AsyncClient, username: str) -> str:
+    response = await client.post("/auth/token", data={"username": username, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def _todo_payload(rng: random.Random) -> dict:
+    n = rng.randrange(1_000_000)
+    return {
+        "title": f"Benchmark todo {n}",
+        "description": f"Created during benchmark run {n}",
+        "priority": rng.randint(1, 5),
+        "complete": rng.random() < 0.3,
+    }
+
+
+async def _send(client: httpx.AsyncClient, route: str, vu: VirtualUser, admin_token: str,
+                rng: random.Random) -> httpx.Response:
+    headers = {"Authorization": f"Bearer {vu.token}"}
+    todo_ids = vu.user.todo_ids
+
+    if route == "POST /auth/token":
+        return await client.post("/auth/token", data={"username": vu.user.username, "password": BENCH_PASSWORD})
+    if route == "GET /todos/":
+        params = {"limit": 50}
+        if rng.random() < 0.3:
+            params["complete"] = "false"
+        return await client.get("/todos/", headers=headers, params=params)
+    if route == "POST /todos/todo":
+        return await client.post("/todos/todo", headers=headers, json=_todo_payload(rng))
+    if route == "PUT /todos/todo/{todo_id}":
+        return await client.put(f"/todos/todo/{rng.choice(todo_ids)}", headers=headers, json=_todo_payload(rng))
+    if route == "DELETE /todos/todo/{todo_id}":
+        todo_id = todo_ids.pop(rng.randrange(len(todo_ids)))
+        return await client.delete(f"/todos/todo/{todo_id}", headers=headers)
+    if route == "GET /admin/users":
+        return await client.get("/admin/users", headers={"Authorization": f"Bearer {admin_token}"})
+    raise ValueError(route)
+
+
+async def run_virtual_user(client: httpx.AsyncClient, vu: VirtualUser, admin_token: str,
+                           rng: random.Random, deadline: float, recorder: Recorder):
+    routes = [route for route, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight in TRAFFIC_MIX]
+
+    while time.monotonic() < deadline:
+        route = rng.choices(routes, weights)[0]
+        # Người dùng đã hết todo thì tạo mới thay vì sửa/xóa
+        if route.startswith(("PUT", "DELETE")) and not vu.user.todo_ids:
+            route = "POST /todos/todo"
+
+        start = time.perf_counter()
+        try:
+            response = await _send(client, route, vu, admin_token, rng)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            status_code = None
+        recorder.record(route, time.perf_counter() - start, status_code)
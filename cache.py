@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from redis.asyncio import Redis
+
+from config import settings
+
+
+class TTLCache:
+    """
+    Cache LRU trong tiến trình, giới hạn số phần tử; mỗi phần tử có thể có thời điểm hết hạn riêng
+    (epoch seconds). Không thread-safe: chỉ dùng từ event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None):
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# --- Backend dùng chung cho các cache async (ví dụ cache danh sách todo) ---
+# Giá trị lưu là chuỗi đã serialize. Backend chỉ cần get/set/delete nên có thể thay bằng
+# bất kỳ client nào tương thích redis.asyncio (kể cả server giả lập khi test).
+
+class MemoryCacheBackend:
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._cache.set(key, value, expires_at=expires_at)
+
+    async def delete(self, key: str):
+        self._cache.pop(key)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class RedisCacheBackend:
+    def __init__(self, client, ttl: float | None = None, prefix: str = ""):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> str | None:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        ttl = ttl if ttl is not None else self.ttl
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    def stats(self) -> dict:
+        # Redis tự quản lý eviction (maxmemory-policy), xem `INFO stats` để biết evicted_keys
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_cache_backend(maxsize: int, ttl: float | None = None, prefix: str = ""):
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(Redis.from_url(settings.REDIS_URL), ttl=ttl, prefix=prefix)
+    return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
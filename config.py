@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import EmailStr, Field
 
@@ -27,6 +27,9 @@ class ServerEnv(StrEnum):
         return self in (self.STAGING, self.PRODUCTION)
 
 
+RATE_LIMIT_PATTERN = r"^\d+/(second|minute|hour|day)$"
+
+
 class CustomBaseSettings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
@@ -40,7 +43,35 @@ class Config(CustomBaseSettings):
     EMAIL_PASSWORD: str
     SMTP_HOST: str
     SMTP_PORT: int
+    SMTP_SECURITY: Literal["auto", "starttls", "ssl", "none"] = Field(
+        default="auto",
+        description="auto: STARTTLS với cổng 587, SSL với cổng khác. none: dùng cho SMTP server giả lập ở local."
+    )
+    SMTP_TIMEOUT: float = 10.0
     DATABASE_URL: str
+    DATABASE_MAX_CONNECTIONS: int = Field(
+        default=30, gt=0,
+        description="Tổng số kết nối tới mỗi database (primary, từng replica) mà tất cả worker của một instance "
+                    "được dùng; chia đều cho WEB_WORKERS. Không tính kết nối LISTEN của todo events (1/worker)."
+    )
+    DATABASE_REPLICA_URLS: List[str] = Field(
+        default=[],
+        description="Danh sách URL các read replica (JSON). Để trống thì mọi truy vấn đi vào primary."
+    )
+    REPLICA_MAX_LAG_SECONDS: float = Field(
+        default=5.0, ge=0,
+        description="Replica trễ hơn primary quá số giây này sẽ không được dùng cho đến lần kiểm tra kế tiếp."
+    )
+    REPLICA_HEALTH_CHECK_INTERVAL: float = Field(default=5.0, gt=0)
+    READ_AFTER_WRITE_SECONDS: float = Field(
+        default=10.0, gt=0,
+        description="Sau khi ghi, các request đọc của người dùng đó đi vào primary trong khoảng thời gian này. "
+                    "Nên lớn hơn REPLICA_MAX_LAG_SECONDS."
+    )
+    SQL_ECHO: bool = Field(
+        default=False,
+        description="In mọi câu lệnh SQL ra stdout. Chỉ bật khi debug vì tốn chi phí cho mỗi truy vấn."
+    )
 
     DEFAULT_ADMIN_USERNAME: str
     DEFAULT_ADMIN_EMAIL: EmailStr
@@ -49,6 +80,19 @@ class Config(CustomBaseSettings):
     DEFAULT_ADMIN_PASSWORD: str
     DEFAULT_ADMIN_PHONE_NUMBER: str
 
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int = Field(default=1, gt=0, description="Số tiến trình worker khi chạy bằng serve.py.")
+    WEB_GRACEFUL_SHUTDOWN_SECONDS: float = Field(
+        default=30.0, gt=0,
+        description="Thời gian chờ các request đang xử lý hoàn tất khi tắt server, sau đó chúng bị huỷ."
+    )
+    FORWARDED_ALLOW_IPS: str = Field(
+        default="127.0.0.1",
+        description="IP hoặc CIDR (phân tách bằng dấu phẩy) của reverse proxy được tin cậy header X-Forwarded-For "
+                    "(dùng để lấy IP thật cho rate limit). Proxy ở container khác cần subnet của mạng Docker."
+    )
+
     CORS_ORIGINS: List[str] = Field(
         default=["http://localhost:3000", "http://localhost:5173"],  # Giá trị mặc định cho phát triển
         description="Danh sách các nguồn gốc (origins) được phép cho CORS."
@@ -62,4 +106,111 @@ class Config(CustomBaseSettings):
         description="Danh sách các HTTP headers được phép cho CORS."
     )
 
+    BCRYPT_ROUNDS: int = Field(
+        default=12, ge=4, le=31,
+        description="Cost của bcrypt. Hash có cost thấp hơn sẽ được hash lại ở lần đăng nhập thành công kế tiếp."
+    )
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = Field(
+        default="thread",
+        description="Loại pool dùng để chạy bcrypt ngoài event loop."
+    )
+    PASSWORD_HASH_WORKERS: int = Field(
+        default=4, gt=0,
+        description="Số worker của pool bcrypt."
+    )
+    PASSWORD_HASH_MAX_PENDING: int = Field(
+        default=32, gt=0,
+        description="Số thao tác bcrypt tối đa được chạy hoặc chờ trong pool cùng lúc."
+    )
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = Field(
+        default=5.0, gt=0,
+        description="Số giây tối đa chờ chỗ trống trong pool trước khi trả về 503."
+    )
+
+    JWT_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Cache các JWT đã xác thực để bỏ qua bước verify HMAC ở các request sau."
+    )
+    JWT_CACHE_MAX_SIZE: int = Field(default=10000, gt=0)
+
+    CACHE_BACKEND: Literal["memory", "redis"] = Field(
+        default="memory",
+        description="memory: cache riêng cho từng tiến trình. redis: cache dùng chung giữa các worker (cần REDIS_URL)."
+    )
+    REDIS_URL: Optional[str] = None
+    TODO_CACHE_ENABLED: bool = True
+    TODO_CACHE_MAX_SIZE: int = Field(default=10000, gt=0)
+    TODO_CACHE_TTL: float = Field(
+        default=300.0, gt=0,
+        description="Thời gian sống (giây) của một danh sách todo trong cache."
+    )
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = Field(default=10000, gt=0)
+    USER_CACHE_TTL: float = Field(
+        default=30.0, gt=0,
+        description="Thời gian sống (giây) của bản ghi người dùng trong cache: thay đổi role/is_active "
+                    "từ nơi khác (worker khác với cache memory, replica trễ) có hiệu lực chậm nhất sau chừng này."
+    )
+
+    TODO_EVENTS_BACKEND: Literal["auto", "memory", "postgres"] = Field(
+        default="auto",
+        description="Nguồn phát sự kiện thay đổi todo cho /todos/stream. memory: chỉ trong một tiến trình "
+                    "(một node, test). postgres: LISTEN/NOTIFY, dùng được với nhiều worker. auto: theo DATABASE_URL."
+    )
+    TODO_STREAM_QUEUE_SIZE: int = Field(
+        default=100, gt=0,
+        description="Số sự kiện tối đa chờ gửi cho một kết nối stream; vượt quá thì client chậm bị ngắt."
+    )
+    TODO_STREAM_KEEPALIVE_SECONDS: float = Field(default=15.0, gt=0)
+    TODO_STREAM_MAX_SECONDS: float = Field(
+        default=300.0, gt=0,
+        description="Đóng stream sau khoảng thời gian này; trình duyệt tự kết nối lại và token được kiểm tra lại."
+    )
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = Field(
+        default="memory",
+        description="memory: bộ đếm riêng cho từng tiến trình. redis: bộ đếm dùng chung giữa các worker (cần REDIS_URL)."
+    )
+    # Dạng "<số request>/<second|minute|hour|day>"; cho phép dồn tối đa <số request> rồi hồi dần đều
+    RATE_LIMIT_LOGIN_PER_IP: str = Field(default="30/minute", pattern=RATE_LIMIT_PATTERN)
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = Field(default="10/minute", pattern=RATE_LIMIT_PATTERN)
+    RATE_LIMIT_REGISTER_PER_IP: str = Field(default="10/hour", pattern=RATE_LIMIT_PATTERN)
+    RATE_LIMIT_REGISTER_PER_EMAIL: str = Field(default="3/hour", pattern=RATE_LIMIT_PATTERN)
+    RATE_LIMIT_FORGOT_PASSWORD_PER_IP: str = Field(default="10/hour", pattern=RATE_LIMIT_PATTERN)
+    RATE_LIMIT_FORGOT_PASSWORD_PER_EMAIL: str = Field(default="3/hour", pattern=RATE_LIMIT_PATTERN)
+
+    EMAIL_SENDER_ENABLED: bool = Field(
+        default=True,
+        description="Chạy worker gửi email outbox trong tiến trình web."
+    )
+    EMAIL_OUTBOX_BATCH_SIZE: int = Field(default=50, gt=0)
+    EMAIL_OUTBOX_POLL_INTERVAL: float = Field(default=5.0, gt=0)
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = Field(default=5, gt=0)
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = Field(
+        default=30.0, gt=0,
+        description="Thời gian chờ trước lần thử lại đầu tiên; tăng gấp đôi sau mỗi lần thất bại."
+    )
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = Field(default=3600.0, gt=0)
+
+    PASSWORD_RESET_TOKEN_SWEEP_INTERVAL: float = Field(
+        default=600.0, gt=0,
+        description="Chu kỳ (giây) xoá các token đặt lại mật khẩu đã hết hạn."
+    )
+    PASSWORD_RESET_TOKEN_SWEEP_BATCH_SIZE: int = Field(default=1000, gt=0)
+
+    USER_PURGE_BATCH_SIZE: int = Field(
+        default=1000, gt=0,
+        description="Số todo bị xoá trong mỗi transaction khi xoá dữ liệu của người dùng đã bị admin xoá."
+    )
+    USER_PURGE_POLL_INTERVAL: float = Field(
+        default=60.0, gt=0,
+        description="Chu kỳ (giây) kiểm tra người dùng chờ xoá (do worker khác đánh dấu hoặc còn dở từ lần chạy trước)."
+    )
+
+    METRICS_ENABLED: bool = Field(
+        default=True,
+        description="Thu thập số liệu request/truy vấn/pool kết nối và mở endpoint /metrics (định dạng Prometheus)."
+    )
+
 settings = Config()
\ No newline at end of file
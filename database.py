@@ -1,38 +1,259 @@
+import asyncio
+import itertools
+import json
 from typing import Annotated
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import Select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from fastapi import Depends
+from fastapi import Depends, Request
 from config import settings
+from cache import create_cache_backend
+from metrics import InstrumentedAsyncQueuePool, instrument_engine
 
 DATABASE_URL = settings.DATABASE_URL
 
 
-async_engine = create_async_engine(
-    DATABASE_URL,
-    echo=True, # Hiển thị các lệnh SQL được thực thi (hữu ích cho debug)
-    pool_pre_ping=True,
-    pool_size=10, # Kích thước pool kết nối
-    max_overflow=20, # Số lượng kết nối tối đa có thể vượt quá pool_size
+def pool_sizes(max_connections: int, workers: int) -> tuple[int, int]:
+    """
+    Chia ngân sách kết nối cho từng worker: trả về (pool_size, max_overflow) của một worker,
+    giữ tỉ lệ 1/3 kết nối thường trực như cấu hình cũ (10 + 20 với 30 kết nối, 1 worker).
+    """
+    per_worker = max(1, max_connections // workers)
+    pool_size = max(1, per_worker // 3)
+    return pool_size, per_worker - pool_size
+
+
+POOL_SIZE, MAX_OVERFLOW = pool_sizes(settings.DATABASE_MAX_CONNECTIONS, settings.WEB_WORKERS)
+
+
+def _create_engine(url: str, primary: bool) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=settings.SQL_ECHO, # Hiển thị các lệnh SQL được thực thi (chỉ bật khi debug)
+        pool_pre_ping=True,
+        pool_size=POOL_SIZE, # Kích thước pool kết nối của mỗi worker
+        max_overflow=MAX_OVERFLOW, # Số lượng kết nối tối đa có thể vượt quá pool_size
+        **({"poolclass": InstrumentedAsyncQueuePool} if settings.METRICS_ENABLED and primary else {}),
+    )
+    if settings.METRICS_ENABLED:
+        # Số liệu pool chỉ theo dõi cho primary; truy vấn trên replica vẫn được tính vào request
+        instrument_engine(engine, pool_metrics=primary)
+    return engine
+
+
+def _create_sessionmaker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+
+
+async_engine = _create_engine(DATABASE_URL, primary=True)
+
+AsyncSessionLocal = _create_sessionmaker(async_engine)
+
+Base = declarative_base()
+
+
+# --- Read replicas ---
+
+# Độ trễ replay của replica Postgres (giây); 0 nếu replica đã replay hết WAL nhận được,
+# vì khi primary không có ghi mới thì pg_last_xact_replay_timestamp() cứ cũ dần.
+# NULL (không dùng được) khi không có WAL receiver (mất kết nối tới primary: WAL nhận được
+# luôn "đã replay hết" nên lag sẽ là 0 dù dữ liệu cũ dần) hoặc chưa replay transaction nào.
+# Chỉ xét có dòng trong pg_stat_wal_receiver: các cột khác cần quyền pg_read_all_stats.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver) THEN NULL"
+    " WHEN pg_last_wal_receive_lsn() IS NULL OR pg_last_xact_replay_timestamp() IS NULL THEN NULL"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
 )
 
 
-AsyncSessionLocal = async_sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = _create_engine(url, primary=False)
+        self.session_factory = _create_sessionmaker(self.engine)
+        # None: chưa kiểm tra lần nào, coi như chưa dùng được
+        self.healthy: bool | None = None
+        self.lag: float | None = None
+
+
+class ReplicaRouter:
+    """
+    Chọn replica cho các request chỉ đọc theo vòng (round-robin), bỏ qua replica không kết nối được
+    hoặc trễ quá max_lag giây. Không còn replica nào dùng được thì đọc từ primary.
+    Trạng thái replica được cập nhật bởi một task nền mỗi check_interval giây.
+    """
+
+    def __init__(self, urls: list[str], max_lag: float, check_interval: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    async def _measure_lag(self, replica: Replica) -> float | None:
+        """Trả về None khi replica không nhận WAL từ primary (xem REPLICA_LAG_QUERY)."""
+        async with replica.engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            lag = await conn.scalar(REPLICA_LAG_QUERY)
+            return None if lag is None else float(lag)
+
+    async def check(self):
+        for replica in self.replicas:
+            try:
+                lag = await asyncio.wait_for(self._measure_lag(replica), timeout=self.check_interval)
+                if lag is None:
+                    healthy, error = False, "not receiving WAL from primary"
+                else:
+                    healthy = lag <= self.max_lag
+                    error = None if healthy else f"lag {lag:.1f}s exceeds {self.max_lag}s"
+            except Exception as e:
+                lag, healthy, error = None, False, f"{type(e).__name__}: {e}"
+
+            if healthy != replica.healthy:
+                if healthy:
+                    print(f"INFO: Replica {replica.name} is available.")
+                else:
+                    print(f"WARNING: Replica {replica.name} is unavailable, reads fall back to primary: {error}")
+            replica.healthy, replica.lag = healthy, lag
+
+    def choose(self) -> async_sessionmaker:
+        available = [replica for replica in self.replicas if replica.healthy]
+        if not available:
+            return AsyncSessionLocal
+        return available[next(self._counter) % len(available)].session_factory
+
+    def stats(self) -> list[dict]:
+        return [{"name": r.name, "healthy": r.healthy, "lag_seconds": r.lag} for r in self.replicas]
+
+
+replica_router = ReplicaRouter(
+    settings.DATABASE_REPLICA_URLS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL,
 )
 
-Base = declarative_base()
+# Người dùng vừa ghi dữ liệu: request đọc của họ đi vào primary trong READ_AFTER_WRITE_SECONDS
+# để luôn thấy thay đổi của chính mình (read-after-write). Dùng backend redis khi chạy nhiều worker.
+_recent_writes = create_cache_backend(maxsize=100000, ttl=settings.READ_AFTER_WRITE_SECONDS,
+                                      prefix="recent-write:")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+async def mark_recent_write(*user_ids: int | None):
+    if not replica_router.enabled:
+        return
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        try:
+            await _recent_writes.set(str(user_id), "1")
+        except Exception as e:
+            print(f"ERROR: Failed to record recent write for user {user_id}: {e}")
+
+
+async def _has_recent_write(user_id: int | None) -> bool:
+    if user_id is None:
+        return False
+    try:
+        return await _recent_writes.get(str(user_id)) is not None
+    except Exception as e:
+        print(f"ERROR: Failed to read recent write for user {user_id}: {e}")
+        return True  # Không chắc thì đọc từ primary
+
 
+def _request_user_id(request: Request) -> int | None:
+    # Được gán bởi auth_utils.resolve_request_user_id (dependency của các router)
+    return getattr(request.state, "user_id", None)
 
-async def get_db():
+
+async def get_db(request: Request):
     async with AsyncSessionLocal() as session:
         yield session
+    if request.method not in SAFE_METHODS:
+        await mark_recent_write(_request_user_id(request))
+
+
+async def get_read_db(request: Request):
+    """
+    Session cho handler chỉ đọc: dùng replica nếu có, trừ khi người dùng vừa ghi dữ liệu.
+    Handler dùng dependency này không được ghi vào database.
+    """
+    session_factory = AsyncSessionLocal
+    if replica_router.enabled and not await _has_recent_write(_request_user_id(request)):
+        session_factory = replica_router.choose()
+    async with session_factory() as session:
+        yield session
 
 
 db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+
+
+def is_postgres(db: AsyncSession) -> bool:
+    """Một số truy vấn dùng tính năng riêng của Postgres và có bản thay thế cho SQLite (test/local)."""
+    return db.bind.dialect.name == "postgresql"
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
 
 
+async def estimate_row_count(db: AsyncSession, query: Select) -> int:
+    """
+    Số dòng query trả về theo ước lượng của planner Postgres (từ thống kê của ANALYZE),
+    không phải đọc các dòng như COUNT(*). Chỉ dùng trên Postgres.
+    """
+    plan = await db.scalar(_Explain(query))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -1,21 +1,47 @@
 from fastapi import FastAPI, Request, status
 from routers import auth, todos, admin
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
 
 
 
-from services.initial_setup import seed_initial_admin_user
+from services.initial_setup import run_startup_tasks
+from modules.auth_modules.password_hasher import password_hasher
+from services.email_sender import email_sender
+from services.token_sweeper import token_sweeper
+from services.user_purger import user_purger
+from metrics import MetricsMiddleware, render_metrics, shutdown_metrics
+from database import async_engine, replica_router
+from modules.todos_modules.todo_events import todo_events
 
-app = FastAPI()
+# orjson serialize nhanh hơn nhiều so với json của thư viện chuẩn với các list todo lớn
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.on_event("startup")
 async def startup_event():
-    await seed_initial_admin_user()
+    await run_startup_tasks()
+    await replica_router.start()
+    await todo_events.start()
+    token_sweeper.start()
+    user_purger.start()
+    if settings.EMAIL_SENDER_ENABLED:
+        email_sender.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await todo_events.stop()
+    await email_sender.stop()
+    await token_sweeper.stop()
+    await user_purger.stop()
+    await replica_router.stop()
+    password_hasher.shutdown()
+    # Chạy sau khi server đã chờ các request đang xử lý hoàn tất (WEB_GRACEFUL_SHUTDOWN_SECONDS)
+    await async_engine.dispose()
+    shutdown_metrics()
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +52,15 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
+if settings.METRICS_ENABLED:
+    # Thêm sau cùng để bọc ngoài mọi middleware khác, đo cả thời gian của chúng
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def test(request: Request):
     return RedirectResponse(url="/auth/login-page", status_code=status.HTTP_302_FOUND)
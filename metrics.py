@@ -0,0 +1,193 @@
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Khi chạy nhiều worker (serve.py), PROMETHEUS_MULTIPROC_DIR được đặt trước khi import module này:
+# mỗi worker ghi số liệu ra file trong thư mục đó và /metrics tổng hợp từ tất cả worker.
+# multiprocess_mode của Gauge quyết định cách gộp giá trị giữa các worker.
+
+# --- Số liệu request HTTP ---
+# Nhãn route là template của route (vd. /todos/todo/{todo_id}) chứ không phải path thật,
+# để số lượng series không tăng theo số id.
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Thời gian xử lý request HTTP.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Số request HTTP đang được xử lý.",
+                             multiprocess_mode="livesum")
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Số truy vấn SQL trong một request HTTP.",
+    ["method", "route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Tổng thời gian chạy truy vấn SQL trong một request HTTP.",
+    ["method", "route"],
+)
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "Số request bị từ chối (429) theo từng giới hạn.", ["limit"]
+)
+
+TODO_TRANSFER_ROWS = Counter(
+    "todo_transfer_rows_total", "Số todo đã import/export (rate() cho số dòng mỗi giây).", ["direction"]
+)
+TODO_TRANSFER_DURATION = Histogram(
+    "todo_transfer_duration_seconds", "Thời gian của một lần import/export todo.", ["direction"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+# --- Số liệu database ---
+
+QUERY_DURATION = Histogram("db_query_duration_seconds", "Thời gian chạy từng truy vấn SQL.")
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Thời gian chờ lấy kết nối từ pool (gồm cả thời gian mở kết nối mới khi cần).",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "Số lần hết thời gian chờ kết nối vì pool đã dùng hết."
+)
+POOL_CHECKED_OUT = Gauge("db_pool_connections_checked_out", "Số kết nối đang được sử dụng.",
+                         multiprocess_mode="livesum")
+POOL_MAX_CONNECTIONS = Gauge("db_pool_max_connections", "Số kết nối tối đa của pool (pool_size + max_overflow).",
+                             multiprocess_mode="livesum")
+POOL_SATURATION = Gauge("db_pool_saturation_ratio",
+                        "Tỉ lệ kết nối đang dùng trên số kết nối tối đa (worker cao nhất khi chạy nhiều worker).",
+                        multiprocess_mode="livemax")
+
+
+class _RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Số liệu truy vấn của request hiện tại; None khi truy vấn chạy ngoài request (worker nền, startup...)
+_request_db_stats: ContextVar[_RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Pool mặc định của engine async, có đo thời gian chờ lấy kết nối."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine, pool_metrics: bool = True):
+    """Gắn event hook đo thời gian truy vấn (và số liệu pool nếu pool_metrics) vào engine."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        QUERY_DURATION.observe(elapsed)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        # Truy vấn lỗi không đi qua after_cursor_execute
+        start_times = context.connection.info.get("query_start_time") if context.connection else None
+        if start_times:
+            start_times.pop()
+
+    pool = sync_engine.pool
+    if pool_metrics and isinstance(pool, AsyncAdaptedQueuePool):
+        max_connections = pool.size() + pool._max_overflow
+        POOL_MAX_CONNECTIONS.set(max_connections)
+        checked_out = 0
+
+        # Cập nhật theo event thay vì đọc pool lúc scrape để dùng được ở chế độ nhiều worker
+        def _update_pool_gauges(delta: int):
+            nonlocal checked_out
+            checked_out += delta
+            POOL_CHECKED_OUT.set(checked_out)
+            POOL_SATURATION.set(checked_out / max_connections if max_connections > 0 else 0.0)
+
+        event.listen(sync_engine, "checkout", lambda *args: _update_pool_gauges(1))
+        event.listen(sync_engine, "checkin", lambda *args: _update_pool_gauges(-1))
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    if "endpoint" in scope:
+        # Ứng dụng được mount (vd. /static)
+        return f"{scope.get('root_path', '')}/{{path}}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware ghi thời gian, status và số truy vấn SQL của mỗi request HTTP."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = _RequestDbStats()
+        token = _request_db_stats.set(stats)
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.dec()
+            _request_db_stats.reset(token)
+
+            method = scope["method"]
+            route = _route_template(scope)
+            REQUEST_DURATION.labels(method, route, str(status_code)).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_DURATION.labels(method, route).observe(stats.seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def shutdown_metrics():
+    """Gọi khi worker dừng để các Gauge live* không còn tính worker này."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, ForeignKey, DateTime, Index, Text, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 
+# Index tìm kiếm username/email (text_pattern_ops, pg_trgm) chỉ có trên Postgres, xem migration 34d4816bcd1b
 class Users(Base):
     __tablename__ = 'users'
 
@@ -15,10 +16,19 @@ class Users(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String)
     phone_number = Column(String, nullable=True)
+    # Admin đã xoá người dùng: tài khoản bị khoá ngay, services/user_purger.py xoá dữ liệu ở nền
+    deletion_requested_at = Column(DateTime, nullable=True)
 
     # Thêm mối quan hệ với PasswordResetToken
-    reset_tokens = relationship("PasswordResetToken", back_populates="user")
-    todos = relationship("Todos", back_populates="owner")
+    # passive_deletes: xoá người dùng không nạp các dòng con, để database tự xoá (ON DELETE CASCADE)
+    reset_tokens = relationship("PasswordResetToken", back_populates="user",
+                                cascade="all, delete-orphan", passive_deletes=True)
+    todos = relationship("Todos", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        Index('ix_users_deletion_requested_at', 'deletion_requested_at',
+              postgresql_where=text('deletion_requested_at IS NOT NULL')),
+    )
 
 class Todos(Base):
     __tablename__ = 'todos'
@@ -28,18 +38,79 @@ class Todos(Base):
     description = Column(String)
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
 
     owner = relationship("Users", back_populates="todos")
 
+    # Index phục vụ phân trang keyset theo từng người dùng (xem todo_crud.TODO_SORT_KEYS)
+    # và lọc theo complete/priority. INCLUDE giúp Postgres trả lời bằng index-only scan.
+    __table_args__ = (
+        Index('ix_todos_owner_id_id', 'owner_id', 'id'),
+        Index('ix_todos_owner_id_priority_id', 'owner_id', 'priority', 'id'),
+        Index('ix_todos_owner_id_complete_priority_id', 'owner_id', 'complete', 'priority', 'id',
+              postgresql_include=['title', 'description']),
+        Index('ix_todos_owner_id_id_open', 'owner_id', 'id',
+              postgresql_include=['title', 'description', 'priority'],
+              postgresql_where=text('complete = false')),
+    )
+
+# Thống kê todo của từng người dùng cho trang /admin/stats, được cập nhật trong cùng transaction
+# với mọi thao tác ghi todos (xem todo_crud._commit_todo_changes) nên đọc không phải quét bảng todos
+class TodoStats(Base):
+    __tablename__ = 'todo_stats'
+
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    priority_1 = Column(Integer, nullable=False, default=0)
+    priority_2 = Column(Integer, nullable=False, default=0)
+    priority_3 = Column(Integer, nullable=False, default=0)
+    priority_4 = Column(Integer, nullable=False, default=0)
+    priority_5 = Column(Integer, nullable=False, default=0)
+    # Tăng sau mỗi lần ghi todos của owner; dùng làm ETag/Last-Modified của danh sách todo
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Phân trang keyset theo số todo (xem todo_crud.TODO_STATS_SORT_KEYS)
+    __table_args__ = (
+        Index('ix_todo_stats_total_owner_id', 'total', 'owner_id'),
+    )
+
 # Thêm bảng mới cho PasswordResetToken
 class PasswordResetToken(Base):
     __tablename__ = 'password_reset_tokens'
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String, unique=True, index=True, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Chỉ lưu SHA-256 (hex) của token: lộ bảng không lộ token, và khoá index luôn dài 64 ký tự
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # Index cho services/token_sweeper.py xoá token hết hạn theo batch
+    expires_at = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("Users", back_populates="reset_tokens")
+
+    # Mỗi người dùng tối đa một token; tạo token mới là upsert theo user_id (xem auth_crud)
+    __table_args__ = (
+        UniqueConstraint('user_id', name='uq_password_reset_tokens_user_id'),
+    )
+
+
+# Hàng đợi email bền vững: endpoint chỉ ghi vào bảng này, services/email_sender.py gửi nền
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default='pending')  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
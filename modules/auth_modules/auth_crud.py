@@ -1,75 +1,271 @@
+import asyncio
+import hashlib
+import secrets
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from models import Users, PasswordResetToken
-from modules.auth_modules.auth_schemas import CreateUserRequest, UserProfileUpdateRequest, UserUpdateAdminRequest
-from modules.auth_modules.auth_utils import get_password_hash
+from sqlalchemy import select, insert, delete, func, literal, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import is_postgres, estimate_row_count
+from models import Users, PasswordResetToken, TodoStats
+from modules.auth_modules.auth_schemas import (
+    CreateUserRequest, UserProfileUpdateRequest, UserUpdateAdminRequest, UserListFilters, BulkUserItem
+)
+from modules.todos_modules.todo_pagination import encode_cursor, decode_cursor
+from modules.auth_modules.password_hasher import password_hasher
+from modules.auth_modules.user_cache import user_cache
 from datetime import datetime, timedelta
-from uuid import uuid4
 
-async def get_user_by_username(db: AsyncSession, username: str):
-    result = await db.execute(select(Users).filter(Users.username == username))
-    return result.scalars().first()
+async def _get_user_by(db: AsyncSession, field: str, value, cached: bool = True):
+    """
+    Đọc người dùng qua user_cache; chỉ kết quả tìm thấy mới được cache.
+    cached=False luôn đọc từ database: dùng khi kiểm tra mật khẩu, vì user_cache không lưu hashed_password
+    (thuộc tính chưa được nạp trên bản ghi từ cache). Instance đã có trong session (ví dụ lấy từ cache
+    bởi get_active_api_user) cũng được nạp lại.
+    """
+    user = await user_cache.get(db, field, value) if cached else None
+    if user is not None:
+        return user
+    query = select(Users).filter(getattr(Users, field) == value)
+    if not cached:
+        query = query.execution_options(populate_existing=True)
+    result = await db.execute(query)
+    user = result.scalars().first()
+    if user is not None:
+        await user_cache.set(user)
+    return user
+
+async def get_user_by_username(db: AsyncSession, username: str, cached: bool = True):
+    return await _get_user_by(db, 'username', username, cached)
 
 async def get_user_by_email(db: AsyncSession, email: str):
-    result = await db.execute(select(Users).filter(Users.email == email))
-    return result.scalars().first()
+    return await _get_user_by(db, 'email', email)
 
-async def get_user_by_id(db: AsyncSession, user_id: int):
-    result = await db.execute(select(Users).filter(Users.id == user_id))
-    return result.scalars().first()
+async def get_user_by_id(db: AsyncSession, user_id: int, cached: bool = True):
+    return await _get_user_by(db, 'id', user_id, cached)
 
-async def create_user(db: AsyncSession, user_data: CreateUserRequest):
-    hashed_password = get_password_hash(user_data.password)
-    db_user = Users(
-        email=user_data.email,
-        username=user_data.username,
-        first_name=user_data.first_name,
-        last_name=user_data.last_name,
-        role=user_data.role,  # Mặc định là user
-        hashed_password=hashed_password,
-        is_active=True,
-        phone_number=user_data.phone_number
+async def existing_user_field(db: AsyncSession, email: str, username: str) -> str | None:
+    """
+    Trả về 'email' hoặc 'username' nếu đã có người dùng trùng giá trị, ngược lại None.
+    Một câu lệnh dùng hai unique index, chạy trước khi tốn công bcrypt ở create_user.
+    """
+    result = await db.execute(
+        select(Users.email, Users.username)
+        .filter(or_(Users.email == email, Users.username == username))
+        .limit(1)
     )
-    db.add(db_user)
-    await db.commit() # Thêm await
-    await db.refresh(db_user) # Thêm await
-    return db_user
+    existing = result.first()
+    if existing is None:
+        return None
+    return 'email' if existing.email == email else 'username'
 
-async def save_password_reset_token(db: AsyncSession, user_id: int) -> str:
-    await db.execute(delete(PasswordResetToken).filter(PasswordResetToken.user_id == user_id))
-    await db.commit() # Thêm await
+async def create_user(db: AsyncSession, user_data: CreateUserRequest) -> int:
+    """
+    Tạo người dùng bằng một câu lệnh INSERT ... RETURNING id và trả về id.
+    Email/username đã tồn tại làm câu lệnh lỗi IntegrityError (xem unique_violation_field),
+    transaction được rollback trước khi lỗi được raise lại.
+    """
+    hashed_password = await password_hasher.hash(user_data.password)
+    try:
+        result = await db.execute(
+            insert(Users)
+            .values(
+                email=user_data.email,
+                username=user_data.username,
+                first_name=user_data.first_name,
+                last_name=user_data.last_name,
+                role=user_data.role,  # Mặc định là user
+                hashed_password=hashed_password,
+                is_active=True,
+                phone_number=user_data.phone_number
+            )
+            .returning(Users.id)
+        )
+        user_id = result.scalar_one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise
+    return user_id
 
-    token = str(uuid4())
-    expires_at = datetime.utcnow() + timedelta(hours=1) # Token hết hạn sau 1 giờ
+def unique_violation_field(error: IntegrityError) -> str | None:
+    """Trả về 'email' hoặc 'username' nếu lỗi là do trùng giá trị unique của cột đó."""
+    # asyncpg cho biết tên constraint (ix_users_email...), SQLite chỉ có message "UNIQUE constraint failed: users.email"
+    constraint = getattr(error.orig.__cause__, 'constraint_name', None)
+    text = constraint or str(error.orig)
+    for field in ('email', 'username'):
+        if f'users_{field}' in text or f'users.{field}' in text:
+            return field
+    return None
 
-    new_token_entry = PasswordResetToken(
-        user_id=user_id,
-        token=token,
-        expires_at=expires_at
-    )
-    db.add(new_token_entry)
+BULK_USER_FIELDS = ('email', 'username', 'first_name', 'last_name', 'role', 'hashed_password',
+                    'is_active', 'phone_number')
+
+async def bulk_create_users(db: AsyncSession, users: list[BulkUserItem]) -> list[dict]:
+    """
+    Tạo nhiều người dùng trong một câu lệnh INSERT ... ON CONFLICT DO NOTHING; người dùng trùng email/username
+    với tài khoản đã có bị bỏ qua. Trả về [{id, username}] của các người dùng đã được tạo.
+    """
+    hashed_passwords = [None] * len(users)
+    indexes = [index for index, user in enumerate(users) if user.password is not None]
+    # Hash theo từng đợt bằng số worker của pool để không vượt quá giới hạn hàng đợi của password_hasher
+    for start in range(0, len(indexes), password_hasher.max_workers):
+        chunk = indexes[start:start + password_hasher.max_workers]
+        hashes = await asyncio.gather(*(password_hasher.hash(users[index].password) for index in chunk))
+        for index, hashed_password in zip(chunk, hashes):
+            hashed_passwords[index] = hashed_password
+
+    rows = [
+        {**user.model_dump(exclude={'password'}), 'hashed_password': hashed_password, 'is_active': True}
+        for user, hashed_password in zip(users, hashed_passwords)
+    ]
+    if is_postgres(db):
+        # Mỗi cột là một mảng, unnest thành các dòng: một câu lệnh với số tham số cố định bất kể số người dùng
+        arrays = [literal([row[field] for row in rows], ARRAY(getattr(Users, field).type))
+                  for field in BULK_USER_FIELDS]
+        values = func.unnest(*arrays).table_valued(*BULK_USER_FIELDS).render_derived()
+        statement = postgresql_insert(Users).from_select(BULK_USER_FIELDS, select(values))
+        result = await db.execute(statement.on_conflict_do_nothing().returning(Users.id, Users.username))
+    else:
+        result = await db.execute(
+            sqlite_insert(Users).on_conflict_do_nothing().returning(Users.id, Users.username), rows
+        )
+    created = [{'id': user_id, 'username': username} for user_id, username in result.all()]
     await db.commit()
+    return created
+
+PASSWORD_RESET_TOKEN_TTL = timedelta(hours=1)
+
+def hash_password_reset_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def save_password_reset_token(db: AsyncSession, user_id: int) -> str:
+    """
+    Tạo token mới thay cho token cũ (nếu có) của người dùng bằng một lệnh upsert.
+    Không commit: caller commit cùng email chứa token để không có token nào mà không có email.
+    """
+    token = secrets.token_urlsafe(32)
+    values = {
+        "user_id": user_id,
+        "token_hash": hash_password_reset_token(token),
+        "expires_at": datetime.utcnow() + PASSWORD_RESET_TOKEN_TTL,
+        "created_at": datetime.utcnow(),
+    }
+    insert = postgresql_insert if is_postgres(db) else sqlite_insert
+    statement = insert(PasswordResetToken).values(**values)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[PasswordResetToken.user_id],
+        set_={key: statement.excluded[key] for key in ("token_hash", "expires_at", "created_at")},
+    ))
     return token
 
 async def get_password_reset_token_entry(db: AsyncSession, token: str):
-    result = await db.execute(select(PasswordResetToken).filter(PasswordResetToken.token == token))
+    result = await db.execute(
+        select(PasswordResetToken).filter(PasswordResetToken.token_hash == hash_password_reset_token(token))
+    )
     return result.scalars().first()
 
+async def delete_expired_password_reset_tokens(db: AsyncSession, limit: int) -> int:
+    """Xoá tối đa `limit` token đã hết hạn (dùng index expires_at). Trả về số token đã xoá."""
+    expired_ids = (
+        select(PasswordResetToken.id)
+        .filter(PasswordResetToken.expires_at < datetime.utcnow())
+        .order_by(PasswordResetToken.expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(delete(PasswordResetToken).filter(PasswordResetToken.id.in_(expired_ids)))
+    await db.commit()
+    return result.rowcount
+
 async def delete_password_reset_token_entry(db: AsyncSession, token_entry: PasswordResetToken):
     await db.delete(token_entry)
     await db.commit()
 
 async def update_user_password(db: AsyncSession, user: Users, new_password: str):
-    user.hashed_password = get_password_hash(new_password)
+    user.hashed_password = await password_hasher.hash(new_password)
     # db.add(user)
     await db.commit()
+    await user_cache.invalidate(user.id)
     await db.refresh(user)
     return user
 
 
-async def get_all_users(db: AsyncSession, skip: int = 0, limit: int = 100):
-    result = await db.execute(select(Users).offset(skip).limit(limit))
-    return result.scalars().all()
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'is_active', 'phone_number')
+USER_COLUMNS = tuple(getattr(Users, field) for field in USER_FIELDS)
+USER_SORT = 'users'
+
+# Tới ngưỡng này tổng số người dùng được đếm chính xác (đếm tối đa ngưỡng + 1 dòng),
+# vượt quá thì dùng ước lượng của planner thay vì COUNT(*) trên cả bảng
+USER_COUNT_EXACT_LIMIT = 1000
+
+
+# Ký tự escape cho LIKE, giống autoescape của SQLAlchemy
+LIKE_ESCAPE = '/'
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('/', '//').replace('%', '/%').replace('_', '/_')
+
+
+def _apply_user_filters(query, filters: UserListFilters):
+    """
+    Tìm theo username/email. Trên Postgres, prefix dùng index lower(...) text_pattern_ops,
+    contains dùng index GIN pg_trgm (xem migration 34d4816bcd1b).
+    """
+    if filters.q:
+        if filters.match == 'prefix':
+            pattern = _escape_like(filters.q.lower()) + '%'
+            query = query.filter(or_(func.lower(Users.username).like(pattern, escape=LIKE_ESCAPE),
+                                     func.lower(Users.email).like(pattern, escape=LIKE_ESCAPE)))
+        else:
+            pattern = '%' + _escape_like(filters.q) + '%'
+            query = query.filter(or_(Users.username.ilike(pattern, escape=LIKE_ESCAPE),
+                                     Users.email.ilike(pattern, escape=LIKE_ESCAPE)))
+    if filters.role is not None:
+        query = query.filter(Users.role == filters.role)
+    if filters.is_active is not None:
+        query = query.filter(Users.is_active == filters.is_active)
+    return query
+
+
+async def _count_users(db: AsyncSession, query) -> tuple[int, bool]:
+    """Trả về (total, total_is_estimate) của query đã lọc."""
+    bounded = query.with_only_columns(Users.id).limit(USER_COUNT_EXACT_LIMIT + 1).subquery()
+    total = await db.scalar(select(func.count()).select_from(bounded))
+    if total <= USER_COUNT_EXACT_LIMIT:
+        return total, False
+    if not is_postgres(db):
+        return await db.scalar(select(func.count()).select_from(query.with_only_columns(Users.id).subquery())), False
+    # Ước lượng có thể thấp hơn số dòng đã đếm được nếu thống kê cũ
+    return max(await estimate_row_count(db, query), total), True
+
+
+async def get_all_users(db: AsyncSession, filters: UserListFilters | None = None,
+                        cursor: str | None = None, limit: int = 50):
+    """
+    Trả về (users, next_cursor, total, total_is_estimate), users là list dict,
+    phân trang keyset theo id tăng dần.
+    """
+    query = _apply_user_filters(select(*USER_COLUMNS), filters or UserListFilters())
+    total, total_is_estimate = await _count_users(db, query)
+
+    if cursor is not None:
+        after_id, = decode_cursor(cursor, USER_SORT, (int,))
+        query = query.filter(Users.id > after_id)
+
+    # Lấy dư một bản ghi để biết còn trang sau hay không
+    result = await db.execute(query.order_by(Users.id).limit(limit + 1))
+    keys = tuple(result.keys())
+    users = [dict(zip(keys, row)) for row in result.tuples()]
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(USER_SORT, [users[-1]['id']])
+    return users, next_cursor, total, total_is_estimate
 
 
 async def get_user_detail_by_id(db: AsyncSession, user_id: int):
@@ -82,13 +278,48 @@ async def update_user_by_admin(db: AsyncSession, user_model: Users, user_data):
         setattr(user_model, field, value)
     # db.add(user_model)
     await db.commit()
+    await user_cache.invalidate(user_model.id)
     await db.refresh(user_model)
     return user_model
 
 
 async def delete_user_by_admin(db: AsyncSession, user_model: Users):
-    await db.delete(user_model)
+    """
+    Khoá tài khoản và đánh dấu chờ xoá; todos, token và chính người dùng được
+    services/user_purger.py xoá ở nền theo từng batch (xem purge_user).
+    """
+    user_model.is_active = False
+    if user_model.deletion_requested_at is None:
+        user_model.deletion_requested_at = datetime.utcnow()
+    await db.commit()
+    await user_cache.invalidate(user_model.id)
+
+
+async def get_users_pending_deletion(db: AsyncSession, limit: int) -> list[int]:
+    result = await db.execute(
+        select(Users.id)
+        .filter(Users.deletion_requested_at.isnot(None))
+        .order_by(Users.deletion_requested_at)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def delete_user_pending_deletion(db: AsyncSession, user_id: int) -> bool:
+    """
+    Xoá người dùng đã được đánh dấu chờ xoá, cùng token đặt lại mật khẩu và thống kê todo.
+    Todos còn sót (ghi bằng JWT cũ đã qua kiểm tra is_active ngay trước khi tài khoản bị khoá)
+    được database xoá theo ON DELETE CASCADE;
+    SQLite không bật khoá ngoại nên các bảng con được xoá tường minh.
+    """
+    await db.execute(delete(PasswordResetToken).filter(PasswordResetToken.user_id == user_id))
+    await db.execute(delete(TodoStats).filter(TodoStats.owner_id == user_id))
+    result = await db.execute(
+        delete(Users).filter(Users.id == user_id).filter(Users.deletion_requested_at.isnot(None))
+    )
     await db.commit()
+    await user_cache.invalidate(user_id)
+    return result.rowcount > 0
 
 
 async def update_user_profile(db: AsyncSession, user_model: Users, profile_data: UserProfileUpdateRequest):
@@ -97,5 +328,6 @@ async def update_user_profile(db: AsyncSession, user_model: Users, profile_data:
         setattr(user_model, field, value)
     db.add(user_model)
     await db.commit()
+    await user_cache.invalidate(user_model.id)
     await db.refresh(user_model)
     return user_model
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Literal, Optional
 
 from pydantic import Field , BaseModel, EmailStr
 
@@ -13,6 +13,32 @@ class CreateUserRequest(BaseModel):
     phone_number: str
 
 
+class BulkUserItem(BaseModel):
+    username: str = Field(..., min_length=3, max_length=50)
+    email: EmailStr
+    first_name: str
+    last_name: str
+    # Không có mật khẩu thì tài khoản chưa đăng nhập được cho tới khi người dùng đặt mật khẩu qua forgot-password
+    password: Optional[str] = Field(None, min_length=8)
+    role: str = 'user'
+    phone_number: Optional[str] = None
+
+
+class BulkCreateUsersRequest(BaseModel):
+    users: List[BulkUserItem] = Field(..., min_length=1, max_length=5000)
+
+
+class BulkCreatedUser(BaseModel):
+    id: int
+    username: str
+
+
+class BulkCreateUsersResponse(BaseModel):
+    created: List[BulkCreatedUser]
+    # username của các người dùng bị bỏ qua vì email/username đã tồn tại
+    skipped: List[str]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -46,6 +72,29 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class AdminUserResponse(UserResponse):
+    is_active: bool | None = None
+
+
+# prefix: username/email bắt đầu bằng q; contains: username/email chứa q (không phân biệt hoa thường)
+UserSearchMatch = Literal['prefix', 'contains']
+
+
+class UserListFilters(BaseModel):
+    q: str | None = Field(None, min_length=1, max_length=100)
+    match: UserSearchMatch = 'prefix'
+    role: str | None = Field(None, max_length=50)
+    is_active: bool | None = None
+
+
+class UserListResponse(BaseModel):
+    users: List[AdminUserResponse]
+    next_cursor: str | None
+    # Chính xác khi không quá USER_COUNT_EXACT_LIMIT, ngược lại là ước lượng của planner
+    total: int
+    total_is_estimate: bool
+
+
 class UserUpdateAdminRequest(BaseModel):
     email: Optional[EmailStr] = None
     username: Optional[str] = Field(None, min_length=3, max_length=50)
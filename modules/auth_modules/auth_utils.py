@@ -5,27 +5,29 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Request
-import smtplib
-from email.mime.text import MIMEText
 from config import settings
+from cache import TTLCache
 
 # Cấu hình JWT
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = 'HS256'
 
-# Cấu hình Email
-EMAIL_HOST = settings.SMTP_HOST
-EMAIL_PORT = settings.SMTP_PORT
-EMAIL_USERNAME = settings.EMAIL_ADDRESS
-EMAIL_PASSWORD = settings.EMAIL_PASSWORD
-EMAIL_FROM = settings.EMAIL_ADDRESS
+# Cache các token đã xác thực; mỗi phần tử hết hạn đúng lúc token hết hạn (claim `exp`)
+token_cache = TTLCache(maxsize=settings.JWT_CACHE_MAX_SIZE)
 
 # Cấu hình Bcrypt
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# min_rounds = default_rounds để hash cũ có cost thấp hơn bị coi là cần cập nhật
+bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto',
+                              bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+                              bcrypt__min_rounds=settings.BCRYPT_ROUNDS)
 
+# Các hàm dưới đây chạy đồng bộ và tốn CPU; trong handler async hãy dùng password_hasher
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return bcrypt_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return bcrypt_context.hash(password)
 
@@ -36,6 +38,11 @@ def create_access_token(username: str, user_id: int, role: str, expires_delta: t
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_access_token(token: str) -> dict:
+    if settings.JWT_CACHE_ENABLED:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return dict(cached)  # Trả về bản sao để caller không sửa được dữ liệu trong cache
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get('sub')
@@ -44,12 +51,36 @@ def decode_access_token(token: str) -> dict:
         if username is None or user_id is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                 detail='Could not validate user.')
-        return {'username': username, 'id': user_id, 'user_role': user_role}
+        user_data = {'username': username, 'id': user_id, 'user_role': user_role}
+        if settings.JWT_CACHE_ENABLED and payload.get('exp') is not None:
+            token_cache.set(token, user_data, expires_at=payload['exp'])
+            return dict(user_data)
+        return user_data
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail='Could not validate user.')
 
-def send_password_reset_email(email_to: str, user_first_name: str, token: str):
+def resolve_request_user_id(request: Request):
+    """
+    Dependency cấp router: lưu id người dùng trong token (Bearer hoặc cookie) vào request.state.user_id
+    để database.get_db/get_read_db chọn primary/replica theo người dùng (read-after-write).
+    Token thiếu hoặc không hợp lệ thì user_id là None; dependency xác thực của handler sẽ trả về 401.
+    """
+    token = request.cookies.get("access_token")
+    authorization = request.headers.get("Authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        token = authorization[7:]
+    request.state.user_id = None
+    if token:
+        try:
+            request.state.user_id = decode_access_token(token).get("id")
+        except HTTPException:
+            pass
+
+def build_password_reset_email(user_first_name: str, token: str) -> tuple[str, str]:
+    """
+    Trả về (subject, body) của email đặt lại mật khẩu. Việc gửi do email outbox đảm nhiệm.
+    """
     reset_link = f"http://localhost:8000/auth/reset-password-page?token={token}" # Thay đổi domain nếu deploy
     subject = "Password Reset Request"
     body = f"""
@@ -69,25 +100,4 @@ def send_password_reset_email(email_to: str, user_first_name: str, token: str):
     Thanks,
     Your App Team
     """
-    try:
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = EMAIL_FROM
-        msg['To'] = email_to
-
-        if EMAIL_PORT == 587:
-            server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-            server.starttls()
-        else:
-            server = smtplib.SMTP_SSL(EMAIL_HOST, EMAIL_PORT)
-
-        with server:
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.send_message(msg)
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                            detail="Failed to send password reset email. Please try again later.")
-
-
-
+    return subject, body
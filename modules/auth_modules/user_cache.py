@@ -0,0 +1,102 @@
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from cache import create_cache_backend
+from config import settings
+from models import Users
+
+# Không cache hashed_password: kiểm tra mật khẩu luôn đọc từ database (auth_crud._get_user_by, cached=False),
+# và hash không nên nằm trong backend dùng chung (redis). Trên bản ghi lấy từ cache, thuộc tính này chưa được nạp.
+USER_CACHE_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name',
+                     'is_active', 'role', 'phone_number')
+
+
+class UserCache:
+    """
+    Cache bản ghi Users theo id, kèm key phụ username/email trỏ tới id. Chỉ key theo id
+    cần xoá khi người dùng thay đổi: key phụ cũ trỏ tới bản ghi có username/email khác
+    (hoặc đã bị xoá) được coi là cache miss.
+
+    Khi hit, bản ghi được gắn vào session như vừa đọc từ database (không chạy SELECT),
+    nên caller vẫn sửa và commit instance như bình thường.
+    """
+
+    def __init__(self, backend, enabled: bool):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    async def _load(self, user_id) -> dict | None:
+        raw = await self.backend.get(f"id:{user_id}")
+        return json.loads(raw) if raw is not None else None
+
+    async def _lookup(self, field: str, value) -> dict | None:
+        if not self.enabled:
+            return None
+        try:
+            if field == 'id':
+                return await self._load(value)
+            user_id = await self.backend.get(f"{field}:{value}")
+            data = await self._load(user_id) if user_id is not None else None
+            return data if data is not None and data[field] == value else None
+        except Exception as e:
+            print(f"ERROR: User cache read failed: {e}")
+            return None
+
+    async def get(self, db: AsyncSession, field: str, value) -> Users | None:
+        """Trả về Users có `field` ('id', 'username' hoặc 'email') bằng value, hoặc None nếu miss."""
+        if not self.enabled:
+            return None
+        data = await self._lookup(field, value)
+
+        user = None
+        if data is not None:
+            # Chỉ lấy các trường hiện tại: bản ghi cache cũ có thể còn trường đã bỏ (hashed_password)
+            user = Users(**{field: data[field] for field in USER_CACHE_FIELDS})
+            make_transient_to_detached(user)
+            user = await db.merge(user, load=False)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    async def set(self, user: Users):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(f"id:{user.id}",
+                                   json.dumps({field: getattr(user, field) for field in USER_CACHE_FIELDS}))
+            await self.backend.set(f"username:{user.username}", str(user.id))
+            await self.backend.set(f"email:{user.email}", str(user.id))
+        except Exception as e:
+            print(f"ERROR: User cache write failed: {e}")
+
+    async def invalidate(self, user_id: int):
+        """Gọi sau khi commit thay đổi (hoặc xoá) người dùng."""
+        if not self.enabled:
+            return
+        try:
+            await self.backend.delete(f"id:{user_id}")
+        except Exception as e:
+            print(f"ERROR: User cache invalidation failed for user {user_id}: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend": self.backend.stats(),
+        }
+
+
+user_cache = UserCache(
+    backend=create_cache_backend(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL,
+                                 prefix="users:"),
+    enabled=settings.USER_CACHE_ENABLED,
+)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from models import EmailOutbox
+
+
+# Nội dung email đã gửi xong (hoặc bỏ cuộc) bị xoá khỏi outbox: email đặt lại mật khẩu chứa token dạng rõ
+REDACTED_BODY = ''
+
+
+async def enqueue_email(db: AsyncSession, recipient: str, subject: str, body: str):
+    """Thêm email vào outbox trong transaction hiện tại; caller commit (cùng với dữ liệu liên quan)."""
+    message = EmailOutbox(recipient=recipient, subject=subject, body=body,
+                          status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+    db.add(message)
+    return message
+
+
+async def claim_due_emails(db: AsyncSession, limit: int, lease_seconds: float):
+    """
+    Nhận tối đa `limit` email đến hạn gửi. next_attempt_at được đẩy lùi thêm `lease_seconds`
+    để worker khác (hoặc lần chạy sau khi worker bị crash) không gửi trùng trong lúc đang gửi.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(EmailOutbox)
+        .filter(EmailOutbox.status == 'pending')
+        .filter(EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    messages = result.scalars().all()
+    for message in messages:
+        message.attempts += 1
+        message.next_attempt_at = now + timedelta(seconds=lease_seconds)
+    await db.commit()
+    return messages
+
+
+def mark_email_sent(message: EmailOutbox):
+    message.status = 'sent'
+    message.sent_at = datetime.utcnow()
+    message.last_error = None
+    message.body = REDACTED_BODY
+
+
+def mark_email_failed(message: EmailOutbox, error: str, retry_at: datetime | None):
+    # retry_at là None khi đã hết số lần thử
+    message.last_error = error[:500]
+    if retry_at is None:
+        message.status = 'failed'
+        message.body = REDACTED_BODY
+    else:
+        message.next_attempt_at = retry_at
+
+
+async def delete_finished_emails(db: AsyncSession, older_than: datetime, limit: int) -> int:
+    """
+    Xoá tối đa `limit` email đã gửi/đã bỏ cuộc có lần thử cuối trước `older_than`
+    (dùng index status, next_attempt_at). Trả về số email đã xoá.
+    """
+    finished_ids = (
+        select(EmailOutbox.id)
+        .filter(EmailOutbox.status.in_(('sent', 'failed')))
+        .filter(EmailOutbox.next_attempt_at < older_than)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(delete(EmailOutbox).filter(EmailOutbox.id.in_(finished_ids)))
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,89 @@
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from config import settings
+
+# Cấu hình Email
+EMAIL_HOST = settings.SMTP_HOST
+EMAIL_PORT = settings.SMTP_PORT
+EMAIL_USERNAME = settings.EMAIL_ADDRESS
+EMAIL_PASSWORD = settings.EMAIL_PASSWORD
+EMAIL_FROM = settings.EMAIL_ADDRESS
+
+# Kết nối đã rảnh quá lâu thường đã bị server đóng; kiểm tra bằng NOOP trước khi dùng lại
+SMTP_IDLE_CHECK_SECONDS = 30
+
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError)
+
+
+class SmtpSession:
+    """
+    Giữ một kết nối SMTP dùng lại cho nhiều email. Các hàm ở đây là blocking,
+    chỉ gọi từ thread riêng (xem services/email_sender.py).
+    """
+
+    def __init__(self, host: str, port: int, security: str, username: str, password: str, timeout: float):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._server: smtplib.SMTP | None = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        security = self.security
+        if security == "auto":
+            security = "starttls" if self.port == 587 else "ssl"
+
+        if security == "ssl":
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if security == "starttls":
+                server.starttls()
+
+        if self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _get_server(self) -> smtplib.SMTP:
+        if self._server is not None and time.monotonic() - self._last_used > SMTP_IDLE_CHECK_SECONDS:
+            try:
+                if self._server.noop()[0] != 250:
+                    self.close()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, sender: str, recipient: str, subject: str, body: str):
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = sender
+        msg['To'] = recipient
+
+        try:
+            self._get_server().send_message(msg)
+        except CONNECTION_ERRORS:
+            # Server đã đóng kết nối cũ: kết nối lại và thử thêm một lần
+            self.close()
+            self._get_server().send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+def create_smtp_session() -> SmtpSession:
+    return SmtpSession(EMAIL_HOST, EMAIL_PORT, settings.SMTP_SECURITY,
+                       EMAIL_USERNAME, EMAIL_PASSWORD, settings.SMTP_TIMEOUT)
@@ -0,0 +1,91 @@
+import json
+from typing import Any
+from uuid import uuid4
+
+from cache import create_cache_backend
+from config import settings
+
+
+class TodoCache:
+    """
+    Cache dữ liệu todo theo từng người dùng với cơ chế version:
+    mỗi owner có một version (chuỗi ngẫu nhiên) nằm trong key của mọi entry.
+    Mỗi lần ghi chỉ cần đổi version, các entry cũ không còn được đọc tới và tự bị LRU/TTL loại bỏ.
+
+    Version là giá trị ngẫu nhiên chứ không phải bộ đếm, nên khi key version bị evict
+    thì version mới cũng không bao giờ trùng với entry cũ.
+
+    Caller đã đọc version trong todo_stats (tăng trong cùng transaction với mỗi lần ghi) có thể truyền
+    nó vào get(): entry được đặt dưới version đó thay vì version ngẫu nhiên, nên không phụ thuộc vào
+    việc invalidate() đã tới backend của tiến trình này hay chưa.
+    """
+
+    def __init__(self, backend, enabled: bool):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version_key(owner_id: int) -> str:
+        return f"todos:{owner_id}:version"
+
+    async def get_version(self, owner_id: int) -> str:
+        version = await self.backend.get(self._version_key(owner_id))
+        if version is None:
+            version = uuid4().hex
+            await self.backend.set(self._version_key(owner_id), version)
+        return version
+
+    async def get(self, owner_id: int, name: str, version: int | None = None) -> tuple[str | None, Any]:
+        """
+        Trả về (version, value). value là None khi cache miss; dùng version này khi gọi set()
+        để dữ liệu đọc trước một lần ghi không bị lưu dưới version mới.
+        """
+        if not self.enabled:
+            return None, None
+        try:
+            version = f"db{version}" if version is not None else await self.get_version(owner_id)
+            raw = await self.backend.get(f"todos:{owner_id}:{version}:{name}")
+        except Exception as e:
+            print(f"ERROR: Todo cache read failed: {e}")
+            return None, None
+
+        if raw is None:
+            self.misses += 1
+            return version, None
+        self.hits += 1
+        return version, json.loads(raw)
+
+    async def set(self, owner_id: int, version: str | None, name: str, value: Any):
+        if not self.enabled or version is None:
+            return
+        try:
+            await self.backend.set(f"todos:{owner_id}:{version}:{name}", json.dumps(value))
+        except Exception as e:
+            print(f"ERROR: Todo cache write failed: {e}")
+
+    async def invalidate(self, owner_id: int):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(self._version_key(owner_id), uuid4().hex)
+        except Exception as e:
+            print(f"ERROR: Todo cache invalidation failed for owner {owner_id}: {e}")
+
+    def stats(self) -> dict:
+        # hits/misses chỉ tính các lần đọc dữ liệu, không tính lần đọc version
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend": self.backend.stats(),
+        }
+
+
+todo_cache = TodoCache(
+    backend=create_cache_backend(maxsize=settings.TODO_CACHE_MAX_SIZE, ttl=settings.TODO_CACHE_TTL),
+    enabled=settings.TODO_CACHE_ENABLED,
+)
@@ -1,41 +1,554 @@
+from datetime import datetime
+from typing import AsyncIterator
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models import Todos
-from modules.todos_modules.todo_schemas import TodoRequest
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_, insert, update, delete, func, case, literal, literal_column, and_, or_, values, column
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import is_postgres, mark_recent_write
+from models import Todos, TodoStats, Users
+from modules.todos_modules.todo_schemas import TodoRequest, TodoBatchOperation, TodoListFilters
+from modules.todos_modules.todo_pagination import encode_cursor, decode_cursor
+from modules.todos_modules.todo_cache import todo_cache
+from modules.todos_modules.todo_events import todo_events, todo_event
+
+# Các kiểu sắp xếp được hỗ trợ (xem TodoSort) -> (cột khóa, giảm dần hay không).
+# Cột khóa luôn kết thúc bằng id để thứ tự là duy nhất; mỗi kiểu có index (owner_id, ...)
+# tương ứng trong models.Todos (index B-tree quét được theo cả hai chiều).
+TODO_SORT_KEYS = {
+    'id': ((Todos.id,), False),
+    '-id': ((Todos.id,), True),
+    'priority': ((Todos.priority, Todos.id), False),
+    '-priority': ((Todos.priority, Todos.id), True),
+}
+
+TODO_FIELDS = ('id', 'title', 'description', 'priority', 'complete', 'owner_id')
+
+
+# Các truy vấn đọc chỉ select những cột này và dựng dict thẳng từ tuple,
+# không tạo instance ORM (không identity map, không theo dõi thay đổi)
+TODO_COLUMNS = tuple(getattr(Todos, field) for field in TODO_FIELDS)
+
+
+def _todo_to_dict(todo: Todos) -> dict:
+    return {field: getattr(todo, field) for field in TODO_FIELDS}
+
+
+def _rows_to_dicts(result) -> list[dict]:
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result.tuples()]
+
+
+# Các cột đếm của TodoStats -> biểu thức tính từ todos của một owner
+TODO_STATS_COUNTS = {
+    'total': func.count(),
+    'completed': func.count().filter(Todos.complete == True),
+    **{f'priority_{priority}': func.count().filter(Todos.priority == priority) for priority in range(1, 6)},
+}
+
+
+def _add_stats_delta(deltas: dict, owner_id: int, complete: bool | None, priority: int | None, sign: int):
+    """Cộng (sign=1) hoặc trừ (sign=-1) một todo vào thay đổi thống kê của owner trong `deltas`."""
+    delta = deltas.setdefault(owner_id, dict.fromkeys(TODO_STATS_COUNTS, 0))
+    delta['total'] += sign
+    if complete:
+        delta['completed'] += sign
+    if f'priority_{priority}' in delta:
+        delta[f'priority_{priority}'] += sign
+
+
+async def _lock_todo_stats(db: AsyncSession, owner_id: int, now: datetime, delta: dict | None = None):
+    """
+    Tạo/khoá dòng thống kê của owner, tăng version và cộng `delta` vào các cột đếm.
+    Dòng chưa tồn tại nghĩa là owner chưa có todo nào (migration 414214bd3c09 đã backfill),
+    nên delta cũng là giá trị ban đầu.
+    """
+    upsert = postgresql_insert if is_postgres(db) else sqlite_insert
+    delta = delta or {}
+    statement = upsert(TodoStats).values(owner_id=owner_id, version=1, updated_at=now,
+                                         **{name: delta.get(name, 0) for name in TODO_STATS_COUNTS})
+    changes = {name: getattr(TodoStats, name) + value for name, value in delta.items() if value}
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[TodoStats.owner_id],
+        set_={'version': TodoStats.version + 1, 'updated_at': now, **changes},
+    ))
+
+
+async def _apply_todo_stats(db: AsyncSession, owner_ids, deltas: dict[int, dict]):
+    """Cập nhật TodoStats bằng thay đổi của từng owner, chi phí không phụ thuộc số todo của owner."""
+    now = datetime.utcnow()
+    # Sắp xếp để các transaction khoá dòng theo cùng thứ tự, tránh deadlock
+    for owner_id in sorted(owner_ids):
+        await _lock_todo_stats(db, owner_id, now, deltas.get(owner_id))
+
+
+async def _refresh_todo_stats(db: AsyncSession, owner_ids):
+    """
+    Đếm lại TodoStats của các owner trong transaction đang ghi. Chi phí tỉ lệ với số todo
+    của owner (quét index owner_id); chỉ dùng khi không biết thay đổi của từng todo (import).
+    """
+    upsert = postgresql_insert if is_postgres(db) else sqlite_insert
+    now = datetime.utcnow()
+    for owner_id in sorted(owner_ids):
+        # Khoá dòng thống kê trước khi đếm: transaction khác ghi todos của cùng owner phải chờ
+        # tới khi transaction này commit, và câu lệnh đếm của nó (snapshot mới) sẽ thấy cả thay đổi ở đây
+        await _lock_todo_stats(db, owner_id, now)
+        counts = select(literal(owner_id), *TODO_STATS_COUNTS.values()).filter(Todos.owner_id == owner_id)
+        statement = upsert(TodoStats).from_select(['owner_id', *TODO_STATS_COUNTS], counts)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[TodoStats.owner_id],
+            set_={name: statement.excluded[name] for name in TODO_STATS_COUNTS},
+        ))
+
+
+async def _commit_todo_changes(db: AsyncSession, *owner_ids: int, events: list[dict] = (),
+                               stats: dict[int, dict] | None = None):
+    """
+    Cập nhật thống kê, commit rồi vô hiệu hóa cache và phát sự kiện (xem todo_events)
+    cho các owner bị ảnh hưởng. Mọi thao tác ghi lên todos phải đi qua hàm này.
+    stats: thay đổi thống kê theo owner (xem _add_stats_delta); None thì đếm lại toàn bộ.
+    """
+    # Đánh dấu trước khi commit để không có khoảng trống nào mà request đọc của owner
+    # lấy dữ liệu cũ từ replica rồi lưu vào cache dưới version mới
+    await mark_recent_write(*owner_ids)
+    if stats is None:
+        await _refresh_todo_stats(db, set(owner_ids))
+    else:
+        await _apply_todo_stats(db, set(owner_ids), stats)
+    await todo_events.stage(db, events)
+    await db.commit()
+    for owner_id in set(owner_ids):
+        await todo_cache.invalidate(owner_id)
+    todo_events.deliver(events)
+
+
+async def _keyset_page(db: AsyncSession, query, sort: str, cursor: str | None, limit: int,
+                       sort_keys: dict = TODO_SORT_KEYS):
+    """
+    Phân trang theo keyset: trả về (todos, next_cursor) với todos là list dict.
+    next_cursor là None ở trang cuối. query phải select các cột khóa sắp xếp.
+    """
+    key_columns, descending = sort_keys[sort]
+
+    if cursor is not None:
+        after = decode_cursor(cursor, sort, tuple(column.type.python_type for column in key_columns))
+        if descending:
+            query = query.filter(tuple_(*key_columns) < tuple_(*after))
+        else:
+            query = query.filter(tuple_(*key_columns) > tuple_(*after))
+
+    order_by = [column.desc() for column in key_columns] if descending else key_columns
+    # Lấy dư một bản ghi để biết còn trang sau hay không
+    result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+    todos = _rows_to_dicts(result)
+
+    next_cursor = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        last = todos[-1]
+        next_cursor = encode_cursor(sort, [last[column.key] for column in key_columns])
+    return todos, next_cursor
+
+
+def _apply_filters(query, filters: TodoListFilters):
+    if filters.complete is not None:
+        query = query.filter(Todos.complete == filters.complete)
+    if filters.priority is not None:
+        query = query.filter(Todos.priority == filters.priority)
+    if filters.priority_min is not None:
+        query = query.filter(Todos.priority >= filters.priority_min)
+    if filters.priority_max is not None:
+        query = query.filter(Todos.priority <= filters.priority_max)
+    return query
+
+
+async def get_all_todos_for_user(db: AsyncSession, owner_id: int, cursor: str | None = None,
+                                 limit: int = 100, sort: str = 'id', filters: TodoListFilters | None = None,
+                                 version: int | None = None):
+    """
+    Trả về (todos, next_cursor) với todos là list dict; kết quả được cache theo owner.
+    version: version trong todo_stats vừa đọc (get_todo_list_version) - khi có, cache dùng đúng version này
+    để dữ liệu trả về luôn khớp với ETag tạo từ nó.
+    """
+    filters = filters or TodoListFilters()
+    cache_name = f"list:{sort}:{limit}:{cursor or ''}:{filters.model_dump_json(exclude_none=True)}"
+    version, cached = await todo_cache.get(owner_id, cache_name, version=version)
+    if cached is not None:
+        return cached['todos'], cached['next_cursor']
+
+    query = _apply_filters(select(*TODO_COLUMNS).filter(Todos.owner_id == owner_id), filters)
+    todos, next_cursor = await _keyset_page(db, query, sort, cursor, limit)
+    await todo_cache.set(owner_id, version, cache_name, {'todos': todos, 'next_cursor': next_cursor})
+    return todos, next_cursor
+
+
+# Cấu hình text search dùng cho cột generated todos.search_vector (xem migration 45dd054ce44e)
+SEARCH_CONFIG = 'simple'
+SEARCH_SORT = 'search'
+
+
+def _search_query(db: AsyncSession, owner_id: int, q: str):
+    """
+    Trả về (query, rank). Postgres dùng cột tsvector + index GIN; SQLite (test) dùng LIKE
+    trên title/description với điểm đơn giản: khớp title được 2 điểm, khớp description được 1 điểm.
+    """
+    query = select(*TODO_COLUMNS).filter(Todos.owner_id == owner_id)
+
+    if is_postgres(db):
+        search_vector = literal_column('todos.search_vector')
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q)
+        rank = func.ts_rank(search_vector, ts_query)
+        return query.filter(search_vector.op('@@')(ts_query)), rank
+
+    rank = None
+    for term in q.split():
+        in_title = Todos.title.icontains(term, autoescape=True)
+        in_description = Todos.description.icontains(term, autoescape=True)
+        query = query.filter(or_(in_title, in_description))
+        term_rank = case((in_title, 2), else_=0) + case((in_description, 1), else_=0)
+        rank = term_rank if rank is None else rank + term_rank
+    return query, rank
+
+
+async def search_todos_for_user(db: AsyncSession, owner_id: int, q: str, cursor: str | None = None,
+                                limit: int = 20):
+    """
+    Tìm kiếm todos theo title/description, sắp xếp theo độ liên quan (rank giảm dần, rồi id giảm dần).
+    Trả về (todos, next_cursor) giống get_all_todos_for_user.
+    """
+    if not q.split():
+        return [], None
+
+    cache_name = f"search:{limit}:{cursor or ''}:{q}"
+    version, cached = await todo_cache.get(owner_id, cache_name)
+    if cached is not None:
+        return cached['todos'], cached['next_cursor']
+
+    query, rank = _search_query(db, owner_id, q)
+    if cursor is not None:
+        after_rank, after_id = decode_cursor(cursor, SEARCH_SORT, (float, int))
+        query = query.filter(or_(rank < after_rank, and_(rank == after_rank, Todos.id < after_id)))
 
-async def get_all_todos_for_user(db: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100):
     result = await db.execute(
-        select(Todos)
-        .filter(Todos.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
+        query.add_columns(rank.label('rank'))
+        .order_by(rank.desc(), Todos.id.desc())
+        .limit(limit + 1)
     )
-    return result.scalars().all()
+    todos = _rows_to_dicts(result)
+
+    next_cursor = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        last = todos[-1]
+        next_cursor = encode_cursor(SEARCH_SORT, [last['rank'], last['id']])
+    await todo_cache.set(owner_id, version, cache_name, {'todos': todos, 'next_cursor': next_cursor})
+    return todos, next_cursor
+
+
+async def get_all_todos_admin(db: AsyncSession, cursor: str | None = None, limit: int = 100):
+    return await _keyset_page(db, select(*TODO_COLUMNS), 'id', cursor, limit)
+
+async def get_todo_list_version(db: AsyncSession, owner_id: int) -> tuple[int, datetime | None]:
+    """
+    Trả về (version, updated_at) của danh sách todo của owner: một lần đọc theo khóa chính
+    của todo_stats. (0, None) nếu owner chưa từng ghi todo.
+    """
+    result = await db.execute(
+        select(TodoStats.version, TodoStats.updated_at).filter(TodoStats.owner_id == owner_id)
+    )
+    row = result.first()
+    return (row.version, row.updated_at) if row is not None else (0, None)
+
+
+# Các kiểu sắp xếp của /admin/stats; 'total' dùng index (total, owner_id) của todo_stats
+TODO_STATS_SORT_KEYS = {
+    'owner_id': ((TodoStats.owner_id,), False),
+    'total': ((TodoStats.total, TodoStats.owner_id), False),
+    '-total': ((TodoStats.total, TodoStats.owner_id), True),
+}
+
+
+async def get_todo_stats_admin(db: AsyncSession, sort: str = '-total', cursor: str | None = None,
+                               limit: int = 50):
+    """
+    Thống kê todo theo người dùng, mỗi trang chỉ đọc `limit` dòng của todo_stats.
+    Trả về (stats, next_cursor) với stats là list dict.
+    """
+    query = (
+        select(TodoStats.owner_id, Users.username, TodoStats.total, TodoStats.completed,
+               *(getattr(TodoStats, f'priority_{priority}') for priority in range(1, 6)),
+               TodoStats.updated_at)
+        .join(Users, Users.id == TodoStats.owner_id)
+    )
+    stats, next_cursor = await _keyset_page(db, query, sort, cursor, limit, sort_keys=TODO_STATS_SORT_KEYS)
+    for entry in stats:
+        entry['completion_rate'] = entry['completed'] / entry['total'] if entry['total'] else 0.0
+        entry['priority_counts'] = {priority: entry.pop(f'priority_{priority}') for priority in range(1, 6)}
+    return stats, next_cursor
 
 async def get_todo_by_id_for_user(db: AsyncSession, todo_id: int, owner_id: int):
+    """
+    Trả về todo dạng dict, hoặc None. Cả kết quả "không tìm thấy" cũng được cache.
+    """
+    cache_name = f"item:{todo_id}"
+    version, cached = await todo_cache.get(owner_id, cache_name)
+    if cached is not None:
+        return cached['todo']
+
     result = await db.execute(
-        select(Todos)
+        select(*TODO_COLUMNS)
         .filter(Todos.id == todo_id)
         .filter(Todos.owner_id == owner_id)
     )
-    return result.scalars().first()
+    todos = _rows_to_dicts(result)
+    todo = todos[0] if todos else None
+    await todo_cache.set(owner_id, version, cache_name, {'todo': todo})
+    return todo
 
 async def create_new_todo(db: AsyncSession, todo_request: TodoRequest, owner_id: int):
     todo_model = Todos(**todo_request.model_dump(), owner_id=owner_id)
     db.add(todo_model)
-    await db.commit()
+    await db.flush()  # Lấy id cho sự kiện trước khi commit
+    stats = {}
+    _add_stats_delta(stats, owner_id, todo_model.complete, todo_model.priority, 1)
+    await _commit_todo_changes(db, owner_id, stats=stats,
+                               events=[todo_event('created', owner_id, todo_model.id, _todo_to_dict(todo_model))])
     await db.refresh(todo_model)
     return todo_model
 
-async def update_existing_todo(db: AsyncSession, todo_model: Todos, todo_request: TodoRequest):
-    for field, value in todo_request.model_dump(exclude_unset=True).items():
-        setattr(todo_model, field, value)
-    db.add(todo_model)
-    await db.commit()
-    await db.refresh(todo_model)
-    return todo_model
+async def _update_todos_postgres(db: AsyncSession, owner_id: int, changes: dict[int, dict]) -> dict[int, tuple]:
+    """
+    Một câu lệnh cho mọi todo: UPDATE todos ... FROM (VALUES ...) new, (SELECT ... FOR UPDATE) old
+    RETURNING todos.*, old.complete, old.priority. Subquery khoá dòng và đọc giá trị cũ trước khi cập nhật.
+    """
+    fields = tuple(next(iter(changes.values())))
+    new = values(column('id', Todos.id.type), *(column(field, getattr(Todos, field).type) for field in fields),
+                 name='new').data([(todo_id, *(todo[field] for field in fields)) for todo_id, todo in changes.items()])
+    old = (
+        select(Todos.id, Todos.complete, Todos.priority)
+        .filter(Todos.owner_id == owner_id)
+        .filter(Todos.id.in_(list(changes)))
+        .with_for_update()
+        .subquery('old')
+    )
+    result = await db.execute(
+        update(Todos)
+        .where(Todos.id == old.c.id)
+        .where(Todos.id == new.c.id)
+        .where(Todos.owner_id == owner_id)
+        .values({field: new.c[field] for field in fields})
+        .returning(*TODO_COLUMNS, old.c.complete.label('old_complete'), old.c.priority.label('old_priority'))
+        .execution_options(synchronize_session=False)
+    )
+    updated = {}
+    for row in _rows_to_dicts(result):
+        old_complete, old_priority = row.pop('old_complete'), row.pop('old_priority')
+        updated[row['id']] = (old_complete, old_priority, row)
+    return updated
+
+async def _update_todos(db: AsyncSession, owner_id: int, changes: dict[int, dict]) -> dict[int, tuple]:
+    """
+    Cập nhật các todo của owner theo `changes` (id -> giá trị mới, cùng các trường cho mọi todo).
+    Trả về id -> (complete cũ, priority cũ, todo mới dạng dict) cho các todo thực sự được cập nhật;
+    todo không thuộc owner hoặc bị xoá đồng thời không có trong kết quả.
 
-async def delete_existing_todo(db: AsyncSession, todo_model: Todos):
-    await db.delete(todo_model)
+    Postgres: một câu lệnh (xem _update_todos_postgres). SQLite gộp subquery vào bảng đang cập nhật
+    (RETURNING trả về giá trị mới thay vì cũ) và bỏ qua FOR UPDATE: đọc giá trị cũ rồi UPDATE có điều kiện
+    giá trị cũ vẫn còn (compare-and-set); todo bị sửa/xoá giữa hai câu lệnh thì đọc lại và thử lại.
+    """
+    if is_postgres(db):
+        return await _update_todos_postgres(db, owner_id, changes)
+    updated = {}
+    for todo_id, values in changes.items():
+        while True:
+            result = await db.execute(
+                select(Todos.complete, Todos.priority)
+                .filter(Todos.id == todo_id)
+                .filter(Todos.owner_id == owner_id)
+                .with_for_update()
+            )
+            old_todo = result.first()
+            if old_todo is None:
+                break
+            result = await db.execute(
+                update(Todos)
+                .where(Todos.id == todo_id)
+                .where(Todos.owner_id == owner_id)
+                .where(Todos.complete == old_todo.complete)
+                .where(Todos.priority == old_todo.priority)
+                .values(**values)
+                .returning(*TODO_COLUMNS)
+            )
+            todos = _rows_to_dicts(result)
+            if todos:
+                updated[todo_id] = (old_todo.complete, old_todo.priority, todos[0])
+                break
+    return updated
+
+async def update_existing_todo(db: AsyncSession, todo_id: int, owner_id: int, todo_request: TodoRequest):
+    """
+    Cập nhật todo của owner (xem _update_todos). Trả về todo sau khi cập nhật dạng dict,
+    hoặc None nếu không có todo phù hợp (kể cả khi todo vừa bị xoá đồng thời).
+    """
+    updated = await _update_todos(db, owner_id, {todo_id: todo_request.model_dump(exclude_unset=True)})
+    if todo_id not in updated:
+        await db.rollback()
+        return None
+    old_complete, old_priority, todo = updated[todo_id]
+    stats = {}
+    _add_stats_delta(stats, owner_id, old_complete, old_priority, -1)
+    _add_stats_delta(stats, owner_id, todo['complete'], todo['priority'], 1)
+    await _commit_todo_changes(db, owner_id, stats=stats, events=[todo_event('updated', owner_id, todo_id, todo)])
+    return todo
+
+async def delete_existing_todo(db: AsyncSession, todo_id: int, owner_id: int):
+    """
+    Xóa bằng một câu lệnh DELETE ... RETURNING. Trả về id đã xóa, hoặc None nếu không có todo phù hợp.
+    """
+    result = await db.execute(
+        delete(Todos)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == owner_id)
+        .returning(Todos.id, Todos.complete, Todos.priority)
+    )
+    deleted = result.first()
+    if deleted is None:
+        await db.rollback()
+        return None
+    stats = {}
+    _add_stats_delta(stats, owner_id, deleted.complete, deleted.priority, -1)
+    await _commit_todo_changes(db, owner_id, stats=stats, events=[todo_event('deleted', owner_id, deleted.id)])
+    return deleted.id
+
+async def delete_todo_by_admin(db: AsyncSession, todo_id: int):
+    """
+    Admin xóa todo bất kỳ. Trả về (id, owner_id) của todo đã xóa, hoặc None nếu không tồn tại.
+    """
+    result = await db.execute(
+        delete(Todos)
+        .where(Todos.id == todo_id)
+        .returning(Todos.id, Todos.owner_id, Todos.complete, Todos.priority)
+    )
+    deleted = result.first()
+    if deleted is None:
+        await db.rollback()
+        return None
+    stats = {}
+    _add_stats_delta(stats, deleted.owner_id, deleted.complete, deleted.priority, -1)
+    await _commit_todo_changes(db, deleted.owner_id, stats=stats,
+                               events=[todo_event('deleted', deleted.owner_id, deleted.id)])
+    return deleted
+
+async def apply_todo_batch(db: AsyncSession, owner_id: int, operations: list[TodoBatchOperation]):
+    """
+    Thực hiện nhiều thao tác create/update/delete trong một transaction với một câu lệnh cho mỗi loại:
+    INSERT nhiều dòng, UPDATE ... FROM (VALUES ...) RETURNING (xem _update_todos) và DELETE ... RETURNING.
+    Trả về kết quả theo đúng thứ tự của `operations`.
+    """
+    creates = [(index, op) for index, op in enumerate(operations) if op.op == 'create']
+    updates = [(index, op) for index, op in enumerate(operations) if op.op == 'update']
+    deletes = [(index, op) for index, op in enumerate(operations) if op.op == 'delete']
+
+    target_ids = [op.id for _, op in updates + deletes]
+    if len(target_ids) != len(set(target_ids)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='Each todo may appear only once per batch.')
+
+    results = [None] * len(operations)
+    events = []
+    stats = {}
+
+    if creates:
+        result = await db.execute(
+            insert(Todos).returning(Todos.id, sort_by_parameter_order=True),
+            [{**op.todo.model_dump(), 'owner_id': owner_id} for _, op in creates]
+        )
+        for (index, op), todo_id in zip(creates, result.scalars().all()):
+            results[index] = {'index': index, 'op': op.op, 'id': todo_id, 'status': 'created'}
+            todo = {'id': todo_id, **op.todo.model_dump(), 'owner_id': owner_id}
+            events.append(todo_event('created', owner_id, todo_id, todo))
+            _add_stats_delta(stats, owner_id, op.todo.complete, op.todo.priority, 1)
+
+    # Trạng thái và thống kê lấy từ các dòng thực sự được UPDATE/DELETE (RETURNING), không từ một
+    # lần SELECT trước đó: todo có thể bị xoá đồng thời giữa hai câu lệnh
+    if updates:
+        updated = await _update_todos(db, owner_id, {op.id: op.todo.model_dump() for _, op in updates})
+        for index, op in updates:
+            results[index] = {'index': index, 'op': op.op, 'id': op.id,
+                              'status': 'updated' if op.id in updated else 'not_found'}
+        for todo_id, (old_complete, old_priority, todo) in updated.items():
+            events.append(todo_event('updated', owner_id, todo_id, todo))
+            _add_stats_delta(stats, owner_id, old_complete, old_priority, -1)
+            _add_stats_delta(stats, owner_id, todo['complete'], todo['priority'], 1)
+
+    if deletes:
+        result = await db.execute(
+            delete(Todos)
+            .where(Todos.owner_id == owner_id)
+            .where(Todos.id.in_([op.id for _, op in deletes]))
+            .returning(Todos.id, Todos.complete, Todos.priority)
+        )
+        deleted_ids = set()
+        for deleted in result:
+            deleted_ids.add(deleted.id)
+            _add_stats_delta(stats, owner_id, deleted.complete, deleted.priority, -1)
+        for index, op in deletes:
+            results[index] = {'index': index, 'op': op.op, 'id': op.id,
+                              'status': 'deleted' if op.id in deleted_ids else 'not_found'}
+        events.extend(todo_event('deleted', owner_id, todo_id) for todo_id in sorted(deleted_ids))
+
+    await _commit_todo_changes(db, owner_id, events=events, stats=stats)
+    return results
+
+async def delete_todos_of_deleted_owner(db: AsyncSession, owner_id: int, limit: int) -> int:
+    """
+    Xoá tối đa `limit` todo của người dùng đang bị xoá (xem auth_crud.delete_user_by_admin),
+    mỗi batch một transaction ngắn. Trả về số todo đã xoá.
+
+    Không đi qua _commit_todo_changes: thống kê của người dùng đang bị xoá không còn cần,
+    dòng TodoStats được xoá luôn; người dùng đã bị khoá nên không có sự kiện nào cần gửi.
+    """
+    todo_ids = (
+        select(Todos.id)
+        .filter(Todos.owner_id == owner_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(delete(Todos).filter(Todos.id.in_(todo_ids)))
+    await db.execute(delete(TodoStats).filter(TodoStats.owner_id == owner_id))
     await db.commit()
+    await todo_cache.invalidate(owner_id)
+    return result.rowcount
+
+IMPORT_COLUMNS = ('title', 'description', 'priority', 'complete', 'owner_id')
+
+async def import_todos(db: AsyncSession, owner_id: int, batches: AsyncIterator[list[dict]]) -> int:
+    """
+    Thêm todos từ các batch (xem todo_import.parse_todo_import) trong một transaction: trên Postgres
+    bằng COPY của asyncpg, nơi khác bằng INSERT executemany theo từng batch. Trả về số todo đã thêm.
+    """
+    copy_records = None
+    if is_postgres(db):
+        # Adapter asyncpg của SQLAlchemy chỉ BEGIN khi chạy câu lệnh đầu tiên;
+        # chạy một câu lệnh trước để COPY nằm trong transaction của session
+        await db.execute(select(literal(1)))
+        connection = await (await db.connection()).get_raw_connection()
+        copy_records = connection.driver_connection.copy_records_to_table
+
+    # Lỗi giữa chừng (dòng không hợp lệ, client ngắt kết nối) không commit gì:
+    # transaction được rollback khi session đóng
+    imported = 0
+    async for rows in batches:
+        if copy_records is not None:
+            await copy_records(Todos.__tablename__, columns=IMPORT_COLUMNS, records=[
+                (row['title'], row['description'], row['priority'], row['complete'], owner_id) for row in rows
+            ])
+        else:
+            await db.execute(insert(Todos), [{**row, 'owner_id': owner_id} for row in rows])
+        imported += len(rows)
 
+    # Một sự kiện reset thay cho từng created: client tự tải lại danh sách.
+    # Không truyền stats: thống kê được đếm lại một lần cho cả lần import
+    await _commit_todo_changes(db, owner_id, events=[todo_event('reset', owner_id, None)])
+    return imported
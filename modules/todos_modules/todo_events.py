@@ -0,0 +1,245 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import AsyncIterator
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+
+TODO_EVENTS_CHANNEL = "todo_events"
+
+# Payload của NOTIFY tối đa 8000 byte; chừa lại một khoảng an toàn
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+
+def todo_event(event_type: str, owner_id: int, todo_id: int | None, todo: dict | None = None) -> dict:
+    """
+    Sự kiện thay đổi todo gửi cho client: type là created/updated/deleted, hoặc reset
+    (id là None) khi nhiều todo thay đổi cùng lúc và client cần tải lại danh sách.
+    todo là dữ liệu mới (None với deleted, hoặc khi quá lớn để gửi qua NOTIFY - client tự tải lại).
+    """
+    return {"type": event_type, "owner_id": owner_id, "id": todo_id, "todo": todo}
+
+
+class TodoSubscription:
+    def __init__(self, owner_id: int, queue_size: int):
+        self.owner_id = owner_id
+        # None trong queue nghĩa là kết nối bị ngắt (client chậm hoặc broker mất sự kiện), client cần tải lại
+        self.queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=queue_size)
+
+
+class TodoEventBroker:
+    """
+    Phát sự kiện thay đổi todo tới các kết nối /todos/stream của owner, trong cùng tiến trình.
+    Mỗi kết nối có queue giới hạn; client không đọc kịp làm queue đầy thì bị ngắt thay vì
+    làm bộ nhớ tăng không giới hạn (backpressure).
+
+    Ghi todo gọi stage() trước commit và deliver() sau commit.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[TodoSubscription]] = defaultdict(set)
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        self._drop_all()
+
+    def subscribe(self, owner_id: int) -> TodoSubscription:
+        subscription = TodoSubscription(owner_id, self.queue_size)
+        self._subscribers[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: TodoSubscription):
+        subscribers = self._subscribers.get(subscription.owner_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.owner_id]
+
+    def _drop(self, subscription: TodoSubscription):
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+        self.dropped += 1
+
+    def _drop_all(self):
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                self._drop(subscription)
+
+    def _dispatch(self, owner_id: int, events: list[dict]):
+        for subscription in list(self._subscribers.get(owner_id, ())):
+            try:
+                for event in events:
+                    subscription.queue.put_nowait(event)
+                    self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    async def stage(self, db: AsyncSession, events: list[dict]):
+        """Gọi trong transaction, trước commit."""
+
+    def deliver(self, events: list[dict]):
+        """Gọi sau khi commit thành công."""
+        by_owner = defaultdict(list)
+        for event in events:
+            by_owner[event["owner_id"]].append(event)
+        for owner_id, owner_events in by_owner.items():
+            self._dispatch(owner_id, owner_events)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class PostgresTodoEventBroker(TodoEventBroker):
+    """
+    Sự kiện được gửi bằng NOTIFY trong chính transaction ghi todo nên chỉ tới tay client khi
+    transaction commit. Mỗi tiến trình giữ một kết nối LISTEN riêng (ngoài pool) và phát lại
+    cho các kết nối stream của mình, nên chạy được với nhiều worker/nhiều node.
+    """
+
+    def __init__(self, queue_size: int, dsn: str):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await super().stop()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+            self._dispatch(message["owner_id"], message["events"])
+        except Exception as e:
+            print(f"ERROR: Invalid todo event notification: {e}")
+
+    async def _listen(self):
+        retry_delay = 1.0
+        connected_before = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                try:
+                    closed = asyncio.Event()
+                    connection.add_termination_listener(lambda _: closed.set())
+                    await connection.add_listener(TODO_EVENTS_CHANNEL, self._on_notify)
+                    if connected_before:
+                        # Sự kiện phát ra trong lúc mất kết nối đã bị lỡ: buộc client tải lại
+                        self._drop_all()
+                    connected_before = True
+                    retry_delay = 1.0
+                    await closed.wait()
+                finally:
+                    if not connection.is_closed():
+                        await connection.close()
+                print("WARNING: Todo event listener connection lost, reconnecting.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ERROR: Todo event listener failed: {e}")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30.0)
+
+    @staticmethod
+    def _payloads(owner_id: int, events: list[dict]) -> list[str]:
+        """Gom sự kiện của một owner thành các payload NOTIFY không vượt quá giới hạn kích thước."""
+        payloads, chunk = [], []
+
+        def encode(chunk_events):
+            return json.dumps({"owner_id": owner_id, "events": chunk_events}, ensure_ascii=False)
+
+        for event in events:
+            if len(encode([event]).encode()) > NOTIFY_PAYLOAD_LIMIT:
+                event = {**event, "todo": None}
+            if chunk and len(encode(chunk + [event]).encode()) > NOTIFY_PAYLOAD_LIMIT:
+                payloads.append(encode(chunk))
+                chunk = []
+            chunk.append(event)
+        if chunk:
+            payloads.append(encode(chunk))
+        return payloads
+
+    async def stage(self, db: AsyncSession, events: list[dict]):
+        by_owner = defaultdict(list)
+        for event in events:
+            by_owner[event["owner_id"]].append(event)
+        for owner_id, owner_events in by_owner.items():
+            for payload in self._payloads(owner_id, owner_events):
+                await db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                 {"channel": TODO_EVENTS_CHANNEL, "payload": payload})
+
+    def deliver(self, events: list[dict]):
+        pass  # Sự kiện quay về qua LISTEN, kể cả với tiến trình đã ghi
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "postgres"}
+
+
+def create_todo_event_broker() -> TodoEventBroker:
+    url = make_url(settings.DATABASE_URL)
+    backend = settings.TODO_EVENTS_BACKEND
+    if backend == "auto":
+        backend = "postgres" if url.get_backend_name() == "postgresql" else "memory"
+    if backend == "postgres":
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresTodoEventBroker(settings.TODO_STREAM_QUEUE_SIZE, dsn)
+    return TodoEventBroker(settings.TODO_STREAM_QUEUE_SIZE)
+
+
+todo_events = create_todo_event_broker()
+
+
+async def stream_todo_events(owner_id: int) -> AsyncIterator[str]:
+    """
+    Stream sự kiện của owner theo định dạng Server-Sent Events.
+    Gửi comment keepalive khi không có sự kiện, đóng stream sau TODO_STREAM_MAX_SECONDS
+    (EventSource tự kết nối lại) và gửi sự kiện `reset` khi client bị ngắt vì không đọc kịp.
+    """
+    subscription = todo_events.subscribe(owner_id)
+    deadline = time.monotonic() + settings.TODO_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=min(settings.TODO_STREAM_KEEPALIVE_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    finally:
+        todo_events.unsubscribe(subscription)
@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+import time
+from typing import AsyncIterator
+
+from sqlalchemy import select
+from database import AsyncSessionLocal
+from metrics import TODO_TRANSFER_ROWS, TODO_TRANSFER_DURATION
+from models import Todos
+
+EXPORT_FIELDS = ('id', 'owner_id', 'title', 'description', 'priority', 'complete')
+
+# Số dòng lấy từ server-side cursor mỗi lần; cũng là kích thước mỗi chunk gửi cho client
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _format_rows(rows, export_format: str) -> str:
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(tuple(row[field] for field in EXPORT_FIELDS) for row in rows)
+        return buffer.getvalue()
+    return ''.join(json.dumps(dict(row), ensure_ascii=False) + '\n' for row in rows)
+
+
+async def stream_todos(export_format: str, owner_id: int | None = None) -> AsyncIterator[str]:
+    """
+    Stream todos (của một owner, hoặc toàn bộ nếu owner_id là None) theo NDJSON hoặc CSV.
+    Dữ liệu được đọc qua server-side cursor theo từng batch nên bộ nhớ không tăng theo kích thước bảng.
+
+    Generator tự mở session riêng vì session của dependency đã đóng khi response bắt đầu được stream.
+    """
+    query = select(*(getattr(Todos, field) for field in EXPORT_FIELDS)).order_by(Todos.id)
+    if owner_id is not None:
+        query = query.filter(Todos.owner_id == owner_id)
+
+    if export_format == 'csv':
+        yield ','.join(EXPORT_FIELDS) + '\r\n'
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.mappings().partitions():
+            yield _format_rows(rows, export_format)
+            TODO_TRANSFER_ROWS.labels('export').inc(len(rows))
+    TODO_TRANSFER_DURATION.labels('export').observe(time.perf_counter() - started)
@@ -0,0 +1,137 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+
+from modules.todos_modules.todo_schemas import TodoRequest
+
+IMPORT_FIELDS = tuple(TodoRequest.model_fields)
+
+# Số dòng được kiểm tra và ghi vào database mỗi lần
+IMPORT_BATCH_SIZE = 5000
+
+# Giới hạn độ dài một dòng (một bản ghi CSV) để bộ nhớ không tăng theo dữ liệu xấu
+IMPORT_MAX_RECORD_CHARS = 64 * 1024
+
+# Số lỗi tối đa được trả về cho client
+IMPORT_MAX_ERRORS = 20
+
+
+def _import_error(errors: list[dict]):
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                         detail={'message': 'Import failed, no todos were imported.', 'errors': errors})
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """Tách body thành các dòng (giữ '\\n' ở cuối), trả về theo từng chunk của body."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    try:
+        async for chunk in chunks:
+            # Chỉ tách theo '\n': str.splitlines còn tách cả U+2028... có thể nằm trong title
+            lines = (pending + decoder.decode(chunk)).split('\n')
+            pending = lines.pop()
+            if len(pending) > IMPORT_MAX_RECORD_CHARS:
+                raise _import_error([{'line': None, 'error': 'Line is too long.'}])
+            if lines:
+                yield [line + '\n' for line in lines]
+        pending += decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise _import_error([{'line': None, 'error': 'Body is not valid UTF-8.'}])
+    if pending:
+        yield [pending]
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[tuple[int, object]]]:
+    line_number = 0
+    async for lines in _lines(chunks):
+        records = []
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                records.append((line_number, json.loads(line)))
+            except ValueError as e:
+                raise _import_error([{'line': line_number, 'error': f'Invalid JSON: {e}'}])
+        yield records
+
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[tuple[int, object]]]:
+    """
+    Bản ghi CSV có thể chứa xuống dòng trong trường được đặt trong ngoặc kép: gom các dòng tới khi
+    số dấu '"' là số chẵn (dấu '"' trong trường được viết đôi nên không làm lệch số chẵn/lẻ).
+    """
+    header = None
+    line_number = 0
+    record, record_line, quotes = [], 0, 0
+    async for lines in _lines(chunks):
+        complete = []
+        for line in lines:
+            line_number += 1
+            if not record:
+                record_line = line_number
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                complete.append((record_line, ''.join(record)))
+                record, quotes = [], 0
+            elif sum(map(len, record)) > IMPORT_MAX_RECORD_CHARS:
+                raise _import_error([{'line': record_line, 'error': 'Record is too long.'}])
+
+        rows = zip((line for line, _ in complete), csv.reader(text for _, text in complete))
+        records = []
+        for record_number, row in rows:
+            if not row:
+                continue
+            if header is None:
+                header = [name.strip() for name in row]
+                missing = [field for field in IMPORT_FIELDS if field not in header]
+                if missing:
+                    raise _import_error([{'line': record_number,
+                                          'error': f'Missing columns: {", ".join(missing)}.'}])
+                continue
+            records.append((record_number, dict(zip(header, row))))
+        yield records
+    if record:
+        raise _import_error([{'line': record_line, 'error': 'Unterminated quoted field.'}])
+
+
+IMPORT_PARSERS = {
+    'ndjson': _ndjson_records,
+    'csv': _csv_records,
+}
+
+
+async def parse_todo_import(chunks: AsyncIterator[bytes], import_format: str) -> AsyncIterator[list[dict]]:
+    """
+    Đọc body dạng NDJSON hoặc CSV (cùng định dạng với export; các cột/khóa khác như id, owner_id được bỏ qua)
+    và trả về các todo hợp lệ theo TodoRequest, từng batch tối đa IMPORT_BATCH_SIZE dòng.
+    Body được đọc dần nên bộ nhớ không tăng theo kích thước file.
+
+    Có dòng không hợp lệ thì cả lần import thất bại (HTTPException 422 kèm số dòng): việc đọc dừng
+    ở cuối batch chứa dòng lỗi đầu tiên hoặc khi đã gặp IMPORT_MAX_ERRORS lỗi.
+    """
+    batch, errors = [], []
+    async for records in IMPORT_PARSERS[import_format](chunks):
+        for line_number, record in records:
+            try:
+                batch.append(TodoRequest.model_validate(record).model_dump())
+            except ValidationError as e:
+                errors.append({'line': line_number,
+                               'error': '; '.join(f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}"
+                                                  for error in e.errors())})
+                if len(errors) >= IMPORT_MAX_ERRORS:
+                    raise _import_error(errors)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                if errors:
+                    raise _import_error(errors)
+                yield batch
+                batch = []
+    if errors:
+        raise _import_error(errors)
+    if batch:
+        yield batch
@@ -0,0 +1,49 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, status
+
+
+# Cursor là chuỗi base64 (url-safe) chứa khóa sắp xếp của bản ghi cuối cùng trên trang trước.
+# Client chỉ cần truyền lại nguyên văn giá trị `next_cursor`, không cần hiểu nội dung bên trong.
+
+def encode_cursor(sort: str, values: list) -> str:
+    raw = json.dumps({'s': sort, 'k': values}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+# Cột khóa kiểu Integer là số nguyên 32-bit trên Postgres: giá trị ngoài khoảng này làm truy vấn lỗi
+CURSOR_INT_MIN, CURSOR_INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def _valid_cursor_value(value, value_type: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if value_type is int:
+        return isinstance(value, int) and CURSOR_INT_MIN <= value <= CURSOR_INT_MAX
+    if value_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, value_type)
+
+
+def decode_cursor(cursor: str, sort: str, types: tuple[type, ...]) -> list:
+    """
+    Trả về các giá trị khóa trong cursor; types là kiểu Python của từng khóa (int, float...).
+    Cursor sai định dạng, khác kiểu sắp xếp hoặc sai số lượng/kiểu khóa đều trả về 400.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data['k']
+        cursor_sort = data['s']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor.')
+
+    # Cursor được tạo với một kiểu sắp xếp khác thì không thể dùng lại
+    if cursor_sort != sort or not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor.')
+    # Giá trị sai kiểu sẽ làm truy vấn lỗi (500) thay vì 400
+    if not all(_valid_cursor_value(value, value_type) for value, value_type in zip(values, types)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor.')
+    return values
@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Annotated, Dict, List, Literal, Union
+
 from pydantic import BaseModel, Field
 
 class TodoRequest(BaseModel):
@@ -5,3 +8,107 @@ class TodoRequest(BaseModel):
     description: str = Field(min_length=3, max_length=100)
     priority: int = Field(gt=0, lt=6)
     complete: bool
+
+
+# Các cột của models.Todos đều nullable nên schema phản hồi cũng vậy
+class TodoResponse(BaseModel):
+    id: int
+    title: str | None
+    description: str | None
+    priority: int | None
+    complete: bool | None
+    owner_id: int | None
+
+
+# --- List ---
+
+# Các kiểu sắp xếp hợp lệ; dấu '-' nghĩa là giảm dần
+TodoSort = Literal['id', '-id', 'priority', '-priority']
+
+
+class TodoListFilters(BaseModel):
+    complete: bool | None = None
+    priority: int | None = Field(None, gt=0, lt=6)
+    priority_min: int | None = Field(None, gt=0, lt=6)
+    priority_max: int | None = Field(None, gt=0, lt=6)
+
+
+class TodoListResponse(BaseModel):
+    todos: List[TodoResponse]
+    next_cursor: str | None
+
+
+class TodoSearchResult(TodoResponse):
+    rank: float
+
+
+class TodoSearchResponse(BaseModel):
+    todos: List[TodoSearchResult]
+    next_cursor: str | None
+
+
+# --- Batch ---
+
+class TodoCreateOperation(BaseModel):
+    op: Literal['create']
+    todo: TodoRequest
+
+
+class TodoUpdateOperation(BaseModel):
+    op: Literal['update']
+    id: int = Field(gt=0)
+    todo: TodoRequest
+
+
+class TodoDeleteOperation(BaseModel):
+    op: Literal['delete']
+    id: int = Field(gt=0)
+
+
+TodoBatchOperation = Annotated[
+    Union[TodoCreateOperation, TodoUpdateOperation, TodoDeleteOperation],
+    Field(discriminator='op')
+]
+
+
+class TodoBatchRequest(BaseModel):
+    operations: List[TodoBatchOperation] = Field(min_length=1, max_length=500)
+
+
+class TodoBatchResult(BaseModel):
+    index: int
+    op: str
+    id: int | None = None
+    status: Literal['created', 'updated', 'deleted', 'not_found']
+
+
+class TodoBatchResponse(BaseModel):
+    results: List[TodoBatchResult]
+
+
+TodoTransferFormat = Literal['ndjson', 'csv']
+
+
+class TodoImportResponse(BaseModel):
+    imported: int
+    seconds: float
+    rows_per_second: float
+
+
+TodoStatsSort = Literal['owner_id', 'total', '-total']
+
+
+class TodoStatsEntry(BaseModel):
+    owner_id: int
+    username: str
+    total: int
+    completed: int
+    completion_rate: float
+    # priority -> số todo
+    priority_counts: Dict[int, int]
+    updated_at: datetime
+
+
+class TodoStatsResponse(BaseModel):
+    stats: List[TodoStatsEntry]
+    next_cursor: str | None
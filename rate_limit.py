@@ -0,0 +1,127 @@
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, status
+from redis.asyncio import Redis
+
+from config import settings
+from metrics import RATE_LIMIT_REJECTIONS
+
+PERIOD_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """
+    Token bucket: tối đa `capacity` request dồn cùng lúc, hồi lại `capacity` token sau mỗi `period` giây.
+    """
+    name: str
+    capacity: int
+    period: float
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        """spec dạng "10/minute" (xem RATE_LIMIT_PATTERN trong config)."""
+        count, unit = spec.split("/")
+        return cls(name=name, capacity=int(count), period=PERIOD_SECONDS[unit])
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+
+# --- Backend ---
+# consume() lấy một token của key và trả về số giây phải chờ (0 nếu được phép). Độ phức tạp O(1).
+
+class MemoryRateLimitBackend:
+    """Bucket trong tiến trình, giới hạn số key (LRU); key bị loại coi như bucket đầy trở lại."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def consume(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_rate)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / limit.refill_rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+# Tính trong Redis để các worker dùng chung bucket một cách nguyên tử; thời gian lấy từ server Redis
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimitBackend:
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.prefix = prefix
+        self._script = client.register_script(REDIS_TOKEN_BUCKET_SCRIPT)
+
+    async def consume(self, key: str, limit: RateLimit) -> float:
+        result = await self._script(keys=[self.prefix + key], args=[limit.capacity, limit.refill_rate])
+        return float(result)
+
+
+def create_rate_limit_backend(maxsize: int = 100000):
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(Redis.from_url(settings.REDIS_URL))
+    return MemoryRateLimitBackend(maxsize=maxsize)
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled: bool):
+        self.backend = backend
+        self.enabled = enabled
+
+    async def check(self, limit: RateLimit, key: str):
+        """Raise 429 kèm Retry-After nếu key đã hết token. Lỗi backend thì cho qua (fail open)."""
+        if not self.enabled:
+            return
+        try:
+            retry_after = await self.backend.consume(f"{limit.name}:{key}", limit)
+        except Exception as e:
+            print(f"ERROR: Rate limit check failed for {limit.name}: {e}")
+            return
+        if retry_after > 0:
+            RATE_LIMIT_REJECTIONS.labels(limit.name).inc()
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Too many requests. Please try again later.",
+                                headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+def client_ip(request: Request) -> str:
+    # Sau reverse proxy, chạy uvicorn với --proxy-headers để request.client là IP thật của client
+    return request.client.host if request.client else "unknown"
+
+
+rate_limiter = RateLimiter(create_rate_limit_backend(), enabled=settings.RATE_LIMIT_ENABLED)
@@ -1,86 +1,166 @@
-from typing import  List
-from fastapi import APIRouter, Depends, HTTPException, Path, status, Request
+from typing import  List, Literal
+from urllib.parse import urlencode
+from fastapi import APIRouter, Depends, HTTPException, Path, status, Request, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from database import db_dependency
+from sqlalchemy import select
+from database import db_dependency, read_db_dependency
 from models import Todos, Users
 from modules.auth_modules.auth_crud import (
-    get_all_users, get_user_detail_by_id, update_user_by_admin, delete_user_by_admin
+    get_all_users, get_user_detail_by_id, update_user_by_admin, delete_user_by_admin, bulk_create_users
 )
-from modules.auth_modules.auth_schemas import UserResponse, UserUpdateAdminRequest
-from routers.auth import user_dependency, api_user_dependency
+from modules.auth_modules.auth_schemas import (
+    UserResponse, AdminUserResponse, UserUpdateAdminRequest, UserListFilters, UserListResponse, UserSearchMatch,
+    BulkCreateUsersRequest, BulkCreateUsersResponse
+)
+from modules.todos_modules.todo_crud import delete_todo_by_admin, get_all_todos_admin, get_todo_stats_admin
+from modules.todos_modules.todo_schemas import TodoStatsResponse, TodoStatsSort
+from modules.todos_modules.todo_export import stream_todos, EXPORT_MEDIA_TYPES
+from modules.todos_modules.todo_cache import todo_cache
+from modules.auth_modules.auth_utils import token_cache, resolve_request_user_id
+from modules.auth_modules.user_cache import user_cache
+from services.user_purger import user_purger
+from routers.auth import user_dependency, api_user_dependency, active_api_user_dependency
 from fastapi.templating import Jinja2Templates
 
 router = APIRouter(
     prefix='/admin',
-    tags=['admin']
+    tags=['admin'],
+    dependencies=[Depends(resolve_request_user_id)]
 )
 
 templates = Jinja2Templates(directory="templates")
 
+ADMIN_TODO_PAGE_SIZE = 100
+ADMIN_USER_PAGE_SIZE = 50
+ADMIN_STATS_PAGE_SIZE = 50
+
 
 # --- Page Routes ---
 
 
 @router.get("/all-todos-page")
-async def render_admin_all_todos_page(request: Request, db: db_dependency,
-                                      user: user_dependency):  # Page Route dùng user_dependency
+async def render_admin_all_todos_page(request: Request, db: read_db_dependency,
+                                      user: user_dependency,  # Page Route dùng user_dependency
+                                      cursor: str | None = Query(None)):
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
 
-    result = await db.execute(select(Todos))
-    todos = result.scalars().all()
-    return templates.TemplateResponse("admin_todos.html", {"request": request, "todos": todos, "user": user})
+    todos, next_cursor = await get_all_todos_admin(db, cursor=cursor, limit=ADMIN_TODO_PAGE_SIZE)
+    return templates.TemplateResponse("admin_todos.html", {"request": request, "todos": todos, "user": user,
+                                                           "next_cursor": next_cursor})
 
 
 @router.get("/users-page")
-async def render_admin_users_page(request: Request, db: db_dependency,
-                                  user: user_dependency):  # Page Route dùng user_dependency
+async def render_admin_users_page(request: Request, db: read_db_dependency,
+                                  user: user_dependency,  # Page Route dùng user_dependency
+                                  q: str | None = Query(None, max_length=100),
+                                  match: UserSearchMatch = Query('prefix'),
+                                  role: str | None = Query(None, max_length=50),
+                                  is_active: Literal['', 'true', 'false'] = Query(''),
+                                  cursor: str | None = Query(None)):
+    if user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
+
+    # Form lọc gửi cả các ô để trống
+    filters = UserListFilters(q=q or None, match=match, role=role or None,
+                              is_active={'true': True, 'false': False}.get(is_active))
+    users, next_cursor, total, total_is_estimate = await get_all_users(db, filters, cursor=cursor,
+                                                                       limit=ADMIN_USER_PAGE_SIZE)
+    next_page_query = None
+    if next_cursor is not None:
+        next_page_query = urlencode({'q': q or '', 'match': match, 'role': role or '', 'is_active': is_active,
+                                     'cursor': next_cursor})
+    return templates.TemplateResponse("admin_users.html", {
+        "request": request, "users": users, "user": user, "filters": filters,
+        "total": total, "total_is_estimate": total_is_estimate, "next_page_query": next_page_query,
+    })
+
+
+@router.get("/stats-page")
+async def render_admin_stats_page(request: Request, db: read_db_dependency,
+                                  user: user_dependency,  # Page Route dùng user_dependency
+                                  sort: TodoStatsSort = Query('-total'),
+                                  cursor: str | None = Query(None)):
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
 
-    users = await get_all_users(db)
-    return templates.TemplateResponse("admin_users.html", {"request": request, "users": users, "user": user})
+    stats, next_cursor = await get_todo_stats_admin(db, sort=sort, cursor=cursor, limit=ADMIN_STATS_PAGE_SIZE)
+    return templates.TemplateResponse("admin_stats.html", {"request": request, "stats": stats, "user": user,
+                                                           "sort": sort, "next_cursor": next_cursor})
 
 
 # --- API Endpoints ---
 
 @router.get("/todo", status_code=status.HTTP_200_OK)
-async def read_all_admin_todos(user: api_user_dependency, db: db_dependency):  # API Endpoint dùng api_user_dependency
+async def read_all_admin_todos(user: api_user_dependency,  # API Endpoint dùng api_user_dependency
+                               format: Literal['ndjson', 'csv'] = Query('ndjson')):
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
 
-    result = await db.execute(select(Todos))
-    return result.scalars().all()
+    # Stream toàn bộ todos qua server-side cursor thay vì nạp cả bảng vào bộ nhớ
+    headers = {}
+    if format == 'csv':
+        headers['Content-Disposition'] = 'attachment; filename="todos.csv"'
+    return StreamingResponse(stream_todos(format), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
 
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_todo_admin(user: api_user_dependency,  # API Endpoint dùng api_user_dependency
+async def delete_todo_admin(user: active_api_user_dependency,  # API Endpoint dùng api_user_dependency
                             db: db_dependency,
                             todo_id: int = Path(gt=0)):
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
 
-    todo_model_result = await db.execute(select(Todos).filter(Todos.id == todo_id))
-    todo_model = todo_model_result.scalars().first()
-
-    if todo_model is None:
+    deleted = await delete_todo_by_admin(db, todo_id)
+    if deleted is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Todo not found.')
 
-    await db.execute(delete(Todos).filter(Todos.id == todo_id))
-    await db.commit()
+
+@router.get("/users", status_code=status.HTTP_200_OK, response_model=UserListResponse)
+async def get_all_users_admin(user: api_user_dependency, db: read_db_dependency,  # API Endpoint dùng api_user_dependency
+                              q: str | None = Query(None, min_length=1, max_length=100),
+                              match: UserSearchMatch = Query('prefix'),
+                              role: str | None = Query(None, max_length=50),
+                              is_active: bool | None = Query(None),
+                              cursor: str | None = Query(None),
+                              limit: int = Query(ADMIN_USER_PAGE_SIZE, gt=0, le=200)):
+    """
+    Danh sách người dùng theo từng trang (id tăng dần), tìm theo tiền tố hoặc chuỗi con của
+    username/email và lọc theo role/is_active. total là ước lượng khi total_is_estimate.
+    """
+    if user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
+
+    filters = UserListFilters(q=q, match=match, role=role, is_active=is_active)
+    users, next_cursor, total, total_is_estimate = await get_all_users(db, filters, cursor=cursor, limit=limit)
+    return {"users": users, "next_cursor": next_cursor, "total": total, "total_is_estimate": total_is_estimate}
 
 
-@router.get("/users", status_code=status.HTTP_200_OK, response_model=List[UserResponse])
-async def get_all_users_admin(user: api_user_dependency, db: db_dependency):  # API Endpoint dùng api_user_dependency
+@router.post("/users/bulk", status_code=status.HTTP_201_CREATED, response_model=BulkCreateUsersResponse)
+async def bulk_create_users_admin(user: active_api_user_dependency, db: db_dependency,  # API Endpoint dùng api_user_dependency
+                                  bulk_request: BulkCreateUsersRequest):
+    """
+    Tạo hàng loạt tài khoản trong một câu lệnh. Người dùng trùng email/username với tài khoản
+    đã có được bỏ qua và liệt kê trong `skipped`. Người dùng không có password cần đặt mật khẩu
+    qua forgot-password trước khi đăng nhập (tránh phải chạy bcrypt cho hàng nghìn tài khoản).
+    """
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
 
-    return await get_all_users(db)
+    usernames = [item.username for item in bulk_request.users]
+    emails = [item.email for item in bulk_request.users]
+    if len(set(usernames)) != len(usernames) or len(set(emails)) != len(emails):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='Each username and email may appear only once per request.')
 
+    created = await bulk_create_users(db, bulk_request.users)
+    created_usernames = {entry['username'] for entry in created}
+    return {"created": created, "skipped": [username for username in usernames if username not in created_usernames]}
 
-@router.get("/users/{user_id}", status_code=status.HTTP_200_OK, response_model=UserResponse)
-async def get_user_admin(user: api_user_dependency, db: db_dependency,
+
+@router.get("/users/{user_id}", status_code=status.HTTP_200_OK, response_model=AdminUserResponse)
+async def get_user_admin(user: api_user_dependency, db: read_db_dependency,
                          user_id: int = Path(gt=0)):  # API Endpoint dùng api_user_dependency
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
@@ -92,7 +172,7 @@ async def get_user_admin(user: api_user_dependency, db: db_dependency,
 
 
 @router.put("/users/{user_id}", status_code=status.HTTP_200_OK, response_model=UserResponse)
-async def update_user_admin(user: api_user_dependency,  # API Endpoint dùng api_user_dependency
+async def update_user_admin(user: active_api_user_dependency,  # API Endpoint dùng api_user_dependency
                             db: db_dependency,
                             user_update_request: UserUpdateAdminRequest,
                             user_id: int = Path(gt=0)):
@@ -102,14 +182,19 @@ async def update_user_admin(user: api_user_dependency,  # API Endpoint dùng api
     user_model = await get_user_detail_by_id(db, user_id)
     if user_model is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found.')
+    if user_model.deletion_requested_at is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='User is being deleted.')
 
     updated_user = await update_user_by_admin(db, user_model, user_update_request)
     return updated_user
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user_admin(user: api_user_dependency, db: db_dependency,
+async def delete_user_admin(user: active_api_user_dependency, db: db_dependency,
                             user_id: int = Path(gt=0)):  # API Endpoint dùng api_user_dependency
+    """
+    Khoá tài khoản ngay (không đăng nhập được nữa) và trả về; todos và tài khoản được xoá ở nền.
+    """
     if user.get('user_role') != 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
 
@@ -118,3 +203,28 @@ async def delete_user_admin(user: api_user_dependency, db: db_dependency,
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found.')
 
     await delete_user_by_admin(db, user_model)
+    user_purger.notify()
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsResponse)
+async def get_todo_stats(user: api_user_dependency, db: read_db_dependency,  # API Endpoint dùng api_user_dependency
+                         sort: TodoStatsSort = Query('-total'),
+                         cursor: str | None = Query(None),
+                         limit: int = Query(ADMIN_STATS_PAGE_SIZE, gt=0, le=200)):
+    """
+    Thống kê todo theo người dùng (tổng số, tỉ lệ hoàn thành, phân bố priority), đọc từ bảng
+    todo_stats được cập nhật cùng lúc với các thao tác ghi todo.
+    """
+    if user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
+
+    stats, next_cursor = await get_todo_stats_admin(db, sort=sort, cursor=cursor, limit=limit)
+    return {"stats": stats, "next_cursor": next_cursor}
+
+
+@router.get("/cache-stats", status_code=status.HTTP_200_OK)
+async def get_cache_stats(user: api_user_dependency):  # API Endpoint dùng api_user_dependency
+    if user.get('user_role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Access Denied: Not an admin')
+
+    return {"token_cache": token_cache.stats(), "todo_cache": todo_cache.stats(), "user_cache": user_cache.stats()}
@@ -1,20 +1,27 @@
 from datetime import datetime, timedelta
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from fastapi.templating import Jinja2Templates
-from database import db_dependency
+from database import db_dependency, read_db_dependency
 from modules.auth_modules.auth_schemas import (
     CreateUserRequest, Token, ForgotPasswordRequest,
     ResetPasswordRequest, ChangePasswordRequest, UserProfileUpdateRequest, UserResponse
 )
 from modules.auth_modules.auth_utils import (
-    verify_password, create_access_token, decode_access_token,
-    send_password_reset_email
+    create_access_token, decode_access_token, resolve_request_user_id,
+    build_password_reset_email
 )
+from modules.auth_modules.password_hasher import password_hasher
+from modules.auth_modules.user_cache import user_cache
+from rate_limit import RateLimit, rate_limiter, client_ip
+from config import settings
+from modules.email_modules.email_crud import enqueue_email
+from services.email_sender import email_sender
 from modules.auth_modules.auth_crud import (
-    get_user_by_username, get_user_by_email, create_user,
+    get_user_by_username, get_user_by_email, existing_user_field, create_user, unique_violation_field,
     save_password_reset_token, get_password_reset_token_entry,
     delete_password_reset_token_entry, update_user_password,
     get_user_by_id, update_user_profile
@@ -22,13 +29,22 @@ from modules.auth_modules.auth_crud import (
 
 router = APIRouter(
     prefix='/auth',
-    tags=['auth']
+    tags=['auth'],
+    dependencies=[Depends(resolve_request_user_id)]
 )
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
 
 templates = Jinja2Templates(directory="templates")
 
+# Giới hạn cho các endpoint tốn bcrypt/SMTP; kiểm tra theo IP trước, rồi theo username/email
+LOGIN_IP_LIMIT = RateLimit.parse("login:ip", settings.RATE_LIMIT_LOGIN_PER_IP)
+LOGIN_USERNAME_LIMIT = RateLimit.parse("login:username", settings.RATE_LIMIT_LOGIN_PER_USERNAME)
+REGISTER_IP_LIMIT = RateLimit.parse("register:ip", settings.RATE_LIMIT_REGISTER_PER_IP)
+REGISTER_EMAIL_LIMIT = RateLimit.parse("register:email", settings.RATE_LIMIT_REGISTER_PER_EMAIL)
+FORGOT_PASSWORD_IP_LIMIT = RateLimit.parse("forgot-password:ip", settings.RATE_LIMIT_FORGOT_PASSWORD_PER_IP)
+FORGOT_PASSWORD_EMAIL_LIMIT = RateLimit.parse("forgot-password:email", settings.RATE_LIMIT_FORGOT_PASSWORD_PER_EMAIL)
+
 
 # --- AUTHENTICATION DEPENDENCIES ---
 
@@ -63,12 +79,37 @@ user_dependency = Annotated[dict, Depends(get_user_from_request)]
 api_user_dependency = Annotated[dict, Depends(get_authenticated_api_user)]
 
 
+# Dùng cho các API Endpoints ghi dữ liệu: JWT vẫn hợp lệ tới khi hết hạn sau khi tài khoản bị khoá
+# hoặc bị xoá (delete_user_by_admin), nên kiểm tra thêm is_active qua user_cache (cache được xoá khi khoá/xoá)
+async def get_active_api_user(user: api_user_dependency, db: db_dependency) -> dict:
+    user_model = await get_user_by_id(db, user['id'])
+    if user_model is None or not user_model.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User is inactive or deleted.")
+    return user
+
+
+# active_api_user_dependency cho API Endpoints ghi dữ liệu
+active_api_user_dependency = Annotated[dict, Depends(get_active_api_user)]
+
+
 # --- AUTHENTICATE USER FUNCTION (Bổ sung vào đây) ---
 # Hàm này dùng để xác thực username/password với database
 async def authenticate_user(username: str, password: str, db: AsyncSession):
-    user = await get_user_by_username(db, username)
-    if not user or not user.is_active or not verify_password(password, user.hashed_password):
+    # Không dùng cache: mật khẩu cũ không được còn hiệu lực sau khi đổi
+    user = await get_user_by_username(db, username, cached=False)
+    # hashed_password rỗng: tài khoản tạo hàng loạt chưa đặt mật khẩu
+    if not user or not user.is_active or not user.hashed_password:
         return False
+
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
+        return False
+
+    # Hash cũ (cost thấp hơn BCRYPT_ROUNDS) được thay bằng hash mới ngay khi đăng nhập thành công
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        await user_cache.invalidate(user.id)
     return user
 
 
@@ -98,7 +139,7 @@ async def render_change_password_page(request: Request, user: user_dependency):
 
 
 @router.get("/profile-page")
-async def render_user_profile_page(request: Request, db: db_dependency, user: user_dependency):
+async def render_user_profile_page(request: Request, db: read_db_dependency, user: user_dependency):
     user_id = user.get("id")
     current_user_data = await get_user_by_id(db, user_id)
     if not current_user_data:
@@ -112,14 +153,31 @@ async def render_user_profile_page(request: Request, db: db_dependency, user: us
 # --- API Endpoints ---
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def register_user(db: db_dependency, create_user_request: CreateUserRequest):
-    if await get_user_by_email(db, create_user_request.email):
+async def register_user(request: Request, db: db_dependency, create_user_request: CreateUserRequest):
+    await rate_limiter.check(REGISTER_IP_LIMIT, client_ip(request))
+    await rate_limiter.check(REGISTER_EMAIL_LIMIT, create_user_request.email.lower())
+    # Kiểm tra trùng bằng một truy vấn theo index trước khi tốn công bcrypt; đăng ký đồng thời
+    # cùng email/username vẫn được phát hiện bởi unique constraint khi INSERT
+    field = await existing_user_field(db, create_user_request.email, create_user_request.username)
+    if field == 'email':
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Email already exists.')
-    if await get_user_by_username(db, create_user_request.username):
+    if field == 'username':
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Username already exists.')
 
     try:
         await create_user(db, create_user_request)
+    except IntegrityError as e:
+        field = unique_violation_field(e)
+        if field == 'email':
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Email already exists.')
+        if field == 'username':
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Username already exists.')
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi đăng ký người dùng: {str(e)}"
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -130,8 +188,10 @@ async def register_user(db: db_dependency, create_user_request: CreateUserReques
 
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+async def login_for_access_token(request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
                                  db: db_dependency):
+    await rate_limiter.check(LOGIN_IP_LIMIT, client_ip(request))
+    await rate_limiter.check(LOGIN_USERNAME_LIMIT, form_data.username.lower())
     # GỌI HÀM AUTHENTICATE_USER ĐÃ ĐƯỢC BỔ SUNG
     user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
@@ -143,14 +203,21 @@ async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm,
 
 
 @router.post("/forgot-password", status_code=status.HTTP_200_OK)
-async def forgot_password_endpoint(request: ForgotPasswordRequest, db: db_dependency):
+async def forgot_password_endpoint(request: ForgotPasswordRequest, db: db_dependency, http_request: Request):
+    await rate_limiter.check(FORGOT_PASSWORD_IP_LIMIT, client_ip(http_request))
+    await rate_limiter.check(FORGOT_PASSWORD_EMAIL_LIMIT, request.email.lower())
     user = await get_user_by_email(db, request.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="If an account with that email exists, a password reset link has been sent.")
 
     token = await save_password_reset_token(db, user.id)
-    send_password_reset_email(user.email, user.first_name, token)
+    # Email được ghi vào outbox và gửi nền, request không phải chờ SMTP.
+    # Token và email được commit cùng một transaction
+    subject, body = build_password_reset_email(user.first_name, token)
+    await enqueue_email(db, user.email, subject, body)
+    await db.commit()
+    email_sender.notify()
 
     return {"message": "If an account with that email exists, a password reset link has been sent."}
 
@@ -178,15 +245,15 @@ async def reset_password_endpoint(request: ResetPasswordRequest, db: db_dependen
 async def change_password_endpoint(
         request: ChangePasswordRequest,
         db: db_dependency,
-        current_user: api_user_dependency
+        current_user: active_api_user_dependency
 ):
     user_id = current_user.get("id")
-    user = await get_user_by_id(db, user_id)
+    user = await get_user_by_id(db, user_id, cached=False)  # Kiểm tra mật khẩu hiện tại trên bản mới nhất
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
 
-    if not verify_password(request.current_password, user.hashed_password):
+    if not user.hashed_password or not await password_hasher.verify(request.current_password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid current password.")
 
     await update_user_password(db, user, request.new_password)
@@ -198,7 +265,7 @@ async def change_password_endpoint(
 async def update_user_profile_api(
         profile_data: UserProfileUpdateRequest,
         db: db_dependency,
-        current_user: api_user_dependency
+        current_user: active_api_user_dependency
 ):
     user_id = current_user.get("id")
     user_model = await get_user_by_id(db, user_id)
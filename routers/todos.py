@@ -1,40 +1,114 @@
+import time
+import zlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import urlencode
 from typing import Annotated, List # Added List for future use if needed
-from fastapi import APIRouter, Depends, HTTPException, Path, Request, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import RedirectResponse
+from starlette.responses import RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from database import get_db
+from database import get_db, read_db_dependency
 from models import Todos
-from modules.todos_modules.todo_schemas import TodoRequest
+from modules.todos_modules.todo_schemas import (
+    TodoRequest, TodoBatchRequest, TodoBatchResponse, TodoSort, TodoListFilters,
+    TodoResponse, TodoListResponse, TodoSearchResponse, TodoTransferFormat, TodoImportResponse
+)
 from modules.todos_modules.todo_crud import (
     get_all_todos_for_user, get_todo_by_id_for_user,
-    create_new_todo, update_existing_todo, delete_existing_todo
+    create_new_todo, update_existing_todo, delete_existing_todo,
+    apply_todo_batch, search_todos_for_user, get_todo_list_version, import_todos
 )
-from routers.auth import user_dependency, api_user_dependency # Import cả hai user_dependency và api_user_dependency
+from modules.todos_modules.todo_events import stream_todo_events
+from modules.todos_modules.todo_export import stream_todos, EXPORT_MEDIA_TYPES
+from modules.todos_modules.todo_import import parse_todo_import
+from metrics import TODO_TRANSFER_ROWS, TODO_TRANSFER_DURATION
+from modules.auth_modules.auth_utils import resolve_request_user_id
+from routers.auth import user_dependency, api_user_dependency, active_api_user_dependency # Import cả hai user_dependency và api_user_dependency
 
 templates = Jinja2Templates(directory="templates")
 
 router = APIRouter(
     prefix="/todos",
-    tags=["todos"]
+    tags=["todos"],
+    dependencies=[Depends(resolve_request_user_id)]
 )
 
 db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
+TODO_PAGE_SIZE = 100
+
+
+# --- Conditional GET ---
+# ETag của danh sách todo gồm owner và version trong todo_stats (tăng sau mỗi lần ghi),
+# nên request có If-None-Match khớp được trả 304 chỉ sau một lần đọc theo khóa chính.
+
+def _list_etag(owner_id: int, version: int, variant: str = "") -> str:
+    # variant: phần phụ thuộc vào thứ khác ngoài dữ liệu todo (vd. thông tin người dùng trên trang HTML)
+    suffix = f".{zlib.crc32(variant.encode()):08x}" if variant else ""
+    return f'W/"{owner_id}.{version}{suffix}"'
+
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    # Chỉ dựa vào If-None-Match: If-Modified-Since chính xác tới giây nên hai lần ghi trong cùng một giây
+    # sẽ cho 304 sai; Last-Modified chỉ để tham khảo
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    # So sánh weak: bỏ qua tiền tố W/
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _cache_headers(etag: str, last_modified: datetime | None) -> dict:
+    # private + no-cache: trình duyệt được giữ bản sao nhưng phải hỏi lại server mỗi lần dùng
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization, Cookie"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+async def _list_version(db: AsyncSession, owner_id: int) -> tuple[int, datetime | None]:
+    version, updated_at = await get_todo_list_version(db, owner_id)
+    # todo_stats lưu giờ UTC không kèm múi giờ
+    return version, updated_at.replace(tzinfo=timezone.utc) if updated_at is not None else None
+
 
 ### Pages ###
 
 @router.get("/todo-page")
-async def render_todo_page(request: Request, db: db_dependency, user: user_dependency): # Page Route dùng user_dependency
+async def render_todo_page(request: Request, db: read_db_dependency, user: user_dependency, # Page Route dùng user_dependency
+                           cursor: str | None = Query(None),
+                           sort: TodoSort = Query('id'),
+                           complete: bool | None = Query(None),
+                           priority: int | None = Query(None, gt=0, lt=6),
+                           priority_min: int | None = Query(None, gt=0, lt=6),
+                           priority_max: int | None = Query(None, gt=0, lt=6)):
     """
-    Render trang hiển thị danh sách Todos của người dùng.
+    Render trang hiển thị danh sách Todos của người dùng, có thể lọc như GET /todos/.
     """
-    todos = await get_all_todos_for_user(db, user.get('id'))
-    return templates.TemplateResponse("todo.html", {"request": request, "todos": todos, "user": user})
+    filters = TodoListFilters(complete=complete, priority=priority,
+                              priority_min=priority_min, priority_max=priority_max)
+    version, last_modified = await _list_version(db, user.get('id'))
+    # Trang còn hiển thị username/role trên navbar
+    etag = _list_etag(user.get('id'), version, f"{user.get('username')}:{user.get('user_role')}")
+    headers = _cache_headers(etag, last_modified)
+    if _is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    todos, next_cursor = await get_all_todos_for_user(db, user.get('id'), cursor=cursor, limit=TODO_PAGE_SIZE,
+                                                      sort=sort, filters=filters, version=version)
+    # base.js gửi lại bộ lọc khi tải lại bảng và dùng nó để bỏ qua sự kiện không khớp
+    filter_query = urlencode({name: str(value).lower() if isinstance(value, bool) else value
+                              for name, value in filters.model_dump().items() if value is not None})
+    return templates.TemplateResponse("todo.html", {"request": request, "todos": todos, "user": user,
+                                                    "cursor": cursor, "next_cursor": next_cursor, "sort": sort,
+                                                    "filter_query": filter_query},
+                                      headers=headers)
 
 
 @router.get("/add-todo-page")
-async def render_add_todo_page(request: Request, db: db_dependency, user: user_dependency): # Page Route dùng user_dependency
+async def render_add_todo_page(request: Request, db: read_db_dependency, user: user_dependency): # Page Route dùng user_dependency
     """
     Render trang thêm Todo mới.
     """
@@ -42,7 +116,7 @@ async def render_add_todo_page(request: Request, db: db_dependency, user: user_d
 
 
 @router.get("/edit-todo-page/{todo_id}")
-async def render_edit_todo_page(request: Request, db: db_dependency, todo_id: int, user: user_dependency): # Page Route dùng user_dependency
+async def render_edit_todo_page(request: Request, db: read_db_dependency, todo_id: int, user: user_dependency): # Page Route dùng user_dependency
     """
     Render trang chỉnh sửa Todo.
     """
@@ -56,31 +130,77 @@ async def render_edit_todo_page(request: Request, db: db_dependency, todo_id: in
 
 
 ### API Endpoints ###
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all_todos(user: api_user_dependency, db: db_dependency, # API Endpoint dùng api_user_dependency
-                         skip: int = Query(0, ge=0),
-                         limit: int = Query(100, gt=0, le=200)):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=TodoListResponse)
+async def read_all_todos(request: Request, response: Response,
+                         user: api_user_dependency, db: read_db_dependency, # API Endpoint dùng api_user_dependency
+                         cursor: str | None = Query(None),
+                         limit: int = Query(100, gt=0, le=200),
+                         sort: TodoSort = Query('id'),
+                         complete: bool | None = Query(None),
+                         priority: int | None = Query(None, gt=0, lt=6),
+                         priority_min: int | None = Query(None, gt=0, lt=6),
+                         priority_max: int | None = Query(None, gt=0, lt=6)):
+    """
+    Lấy Todos của người dùng hiện tại theo từng trang, có thể lọc theo complete/priority và sắp xếp.
+    Truyền lại `next_cursor` của phản hồi trước vào `cursor` (cùng bộ lọc và sort) để lấy trang tiếp theo.
+    Phản hồi có ETag; gửi lại trong If-None-Match để nhận 304 khi danh sách không đổi.
+    """
+    if priority_min is not None and priority_max is not None and priority_min > priority_max:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="priority_min must not be greater than priority_max.")
+
+    version, last_modified = await _list_version(db, user.get('id'))
+    etag = _list_etag(user.get('id'), version)
+    headers = _cache_headers(etag, last_modified)
+    if _is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    filters = TodoListFilters(complete=complete, priority=priority,
+                              priority_min=priority_min, priority_max=priority_max)
+    todos, next_cursor = await get_all_todos_for_user(db, user.get('id'), cursor=cursor, limit=limit,
+                                                      sort=sort, filters=filters, version=version)
+    return {"todos": todos, "next_cursor": next_cursor}
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=TodoSearchResponse)
+async def search_todos(user: api_user_dependency, db: read_db_dependency, # API Endpoint dùng api_user_dependency
+                       q: str = Query(min_length=1, max_length=200),
+                       cursor: str | None = Query(None),
+                       limit: int = Query(20, gt=0, le=100)):
+    """
+    Tìm kiếm full-text trong title/description các Todo của người dùng hiện tại.
+    Kết quả sắp xếp theo độ liên quan và phân trang bằng `next_cursor`.
     """
-    Lấy tất cả Todos của người dùng hiện tại.
+    todos, next_cursor = await search_todos_for_user(db, user.get('id'), q, cursor=cursor, limit=limit)
+    return {"todos": todos, "next_cursor": next_cursor}
+
+
+@router.get("/stream")
+async def stream_todo_changes(user: user_dependency): # Dùng cookie vì EventSource của trình duyệt không gửi được header
+    """
+    Server-Sent Events: đẩy các sự kiện created/updated/deleted của Todos thuộc người dùng hiện tại.
+    Sự kiện `reset` nghĩa là client đã bỏ lỡ sự kiện (đọc quá chậm) và cần tải lại danh sách.
     """
-    return await get_all_todos_for_user(db, user.get('id'), skip=skip, limit=limit)
+    return StreamingResponse(stream_todo_events(user.get('id')), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
-@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK)
+@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse)
 async def read_single_todo(user: api_user_dependency, # API Endpoint dùng api_user_dependency
-                           db: db_dependency,
+                           db: read_db_dependency,
                            todo_id: int = Path(gt=0)):
     """
     Lấy một Todo cụ thể của người dùng hiện tại.
     """
-    todo_model = await get_todo_by_id_for_user(db, todo_id, user.get('id'))
-    if todo_model is not None:
-        return todo_model
+    todo = await get_todo_by_id_for_user(db, todo_id, user.get('id'))
+    if todo is not None:
+        return todo
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found.")
 
 
 @router.post("/todo", status_code=status.HTTP_201_CREATED)
-async def create_todo_item(user: api_user_dependency, # API Endpoint dùng api_user_dependency
+async def create_todo_item(user: active_api_user_dependency, # API Endpoint dùng api_user_dependency
                            db: db_dependency,
                            todo_request: TodoRequest):
     """
@@ -91,28 +211,65 @@ async def create_todo_item(user: api_user_dependency, # API Endpoint dùng api_u
 
 
 @router.put("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_todo_item(user: api_user_dependency, # API Endpoint dùng api_user_dependency
+async def update_todo_item(user: active_api_user_dependency, # API Endpoint dùng api_user_dependency
                            db: db_dependency,
                            todo_id: int,
                            todo_request: TodoRequest):
     """
     Cập nhật một Todo hiện có của người dùng hiện tại.
     """
-    todo_model = await get_todo_by_id_for_user(db, todo_id, user.get('id'))
+    todo_model = await update_existing_todo(db, todo_id, user.get('id'), todo_request)
     if todo_model is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found.")
 
-    await update_existing_todo(db, todo_model, todo_request)
-
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_todo_item(user: api_user_dependency, # API Endpoint dùng api_user_dependency
+async def delete_todo_item(user: active_api_user_dependency, # API Endpoint dùng api_user_dependency
                            db: db_dependency, todo_id: int = Path(gt=0)):
     """
     Xóa một Todo của người dùng hiện tại.
     """
-    todo_model = await get_todo_by_id_for_user(db, todo_id, user.get('id'))
-    if todo_model is None:
+    deleted_id = await delete_existing_todo(db, todo_id, user.get('id'))
+    if deleted_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found.")
 
-    await delete_existing_todo(db, todo_model)
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=TodoBatchResponse)
+async def batch_todo_items(user: active_api_user_dependency, # API Endpoint dùng api_user_dependency
+                           db: db_dependency,
+                           batch_request: TodoBatchRequest):
+    """
+    Tạo, cập nhật và xóa nhiều Todo trong một request và một transaction.
+    Mỗi phần tử trả về có status created/updated/deleted hoặc not_found.
+    """
+    results = await apply_todo_batch(db, user.get('id'), batch_request.operations)
+    return {"results": results}
+
+
+@router.post("/import", status_code=status.HTTP_201_CREATED, response_model=TodoImportResponse)
+async def import_todo_items(request: Request, user: active_api_user_dependency, # API Endpoint dùng api_user_dependency
+                            db: db_dependency,
+                            format: TodoTransferFormat = Query('ndjson')):
+    """
+    Import Todos từ body dạng NDJSON (mỗi dòng một object) hoặc CSV (dòng đầu là tên cột),
+    cùng định dạng với /todos/export. Body được đọc dần theo từng batch nên không giới hạn kích thước;
+    tất cả dòng được thêm trong một transaction, có dòng không hợp lệ thì không dòng nào được thêm (422).
+    """
+    started = time.perf_counter()
+    imported = await import_todos(db, user.get('id'), parse_todo_import(request.stream(), format))
+    seconds = time.perf_counter() - started
+    TODO_TRANSFER_ROWS.labels('import').inc(imported)
+    TODO_TRANSFER_DURATION.labels('import').observe(seconds)
+    return {"imported": imported, "seconds": round(seconds, 3),
+            "rows_per_second": round(imported / seconds, 1) if seconds > 0 else 0.0}
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_todo_items(user: api_user_dependency, # API Endpoint dùng api_user_dependency
+                            format: TodoTransferFormat = Query('ndjson')):
+    """
+    Export toàn bộ Todos của người dùng hiện tại theo NDJSON hoặc CSV, stream qua server-side cursor.
+    """
+    headers = {'Content-Disposition': f'attachment; filename="todos.{format}"'}
+    return StreamingResponse(stream_todos(format, owner_id=user.get('id')),
+                             media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,55 @@
+"""
+Chạy server production với nhiều worker:
+
+    python serve.py
+
+Số worker, host/port và thời gian tắt an toàn lấy từ cấu hình (WEB_WORKERS, WEB_HOST, WEB_PORT,
+WEB_GRACEFUL_SHUTDOWN_SECONDS). Mỗi worker có pool kết nối riêng, kích thước được chia từ
+DATABASE_MAX_CONNECTIONS (xem database.pool_sizes).
+"""
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+from config import settings
+
+
+def check_shared_state():
+    """
+    Cache, rate limit và read-after-write (database._recent_writes) với backend memory là riêng cho từng
+    tiến trình: với nhiều worker, ghi ở một worker không vô hiệu hóa cache của worker khác và giới hạn
+    bị nhân theo số worker. Không chạy nhiều worker khi chưa cấu hình redis.
+    """
+    memory_backends = [name for name in ("CACHE_BACKEND", "RATE_LIMIT_BACKEND")
+                       if getattr(settings, name) == "memory"]
+    if settings.WEB_WORKERS > 1 and memory_backends:
+        raise SystemExit(f"ERROR: WEB_WORKERS={settings.WEB_WORKERS} requires redis for shared state; "
+                         f"set {', '.join(memory_backends)}=redis and REDIS_URL, or WEB_WORKERS=1.")
+
+
+def main():
+    check_shared_state()
+    multiproc_dir = None
+    if settings.WEB_WORKERS > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Các worker ghi số liệu Prometheus vào thư mục chung để /metrics tổng hợp được
+        multiproc_dir = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = multiproc_dir
+    try:
+        uvicorn.run(
+            "main:app",
+            host=settings.WEB_HOST,
+            port=settings.WEB_PORT,
+            workers=settings.WEB_WORKERS,
+            proxy_headers=True,
+            forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+            timeout_graceful_shutdown=settings.WEB_GRACEFUL_SHUTDOWN_SECONDS,
+        )
+    finally:
+        if multiproc_dir is not None:
+            shutil.rmtree(multiproc_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
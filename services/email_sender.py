@@ -0,0 +1,122 @@
+import asyncio
+import random
+import smtplib
+from datetime import datetime, timedelta
+
+from config import settings
+from database import AsyncSessionLocal
+from modules.email_modules.email_crud import (
+    claim_due_emails, mark_email_sent, mark_email_failed
+)
+from modules.email_modules.email_utils import SmtpSession, create_smtp_session, EMAIL_FROM
+
+# Lỗi chỉ liên quan tới một email (người nhận bị từ chối...), các email khác trong batch vẫn gửi tiếp
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+class EmailSender:
+    """
+    Worker nền gửi email từ bảng email_outbox theo batch qua một phiên SMTP dùng lại,
+    thử lại với backoff luỹ thừa. SMTP chạy trên thread riêng để không chặn event loop.
+    """
+
+    def __init__(self, smtp: SmtpSession, batch_size: int, poll_interval: float, max_attempts: int,
+                 retry_base_seconds: float, retry_max_seconds: float):
+        self.smtp = smtp
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.smtp.close)
+
+    def notify(self):
+        """Báo cho worker có email mới để gửi ngay thay vì chờ lần poll kế tiếp."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.send_pending()
+            except Exception as e:
+                print(f"ERROR: Email outbox worker failed: {e}")
+                sent = 0
+
+            # Batch đầy thì có thể còn email đến hạn, xử lý tiếp ngay
+            if sent >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _retry_at(self, attempts: int) -> datetime | None:
+        if attempts >= self.max_attempts:
+            return None
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return datetime.utcnow() + timedelta(seconds=delay * random.uniform(1.0, 1.2))
+
+    def _send_batch(self, messages: list[tuple[str, str, str]]) -> list[str | None]:
+        # Chạy trên thread: trả về lỗi (hoặc None nếu thành công) cho từng email
+        results: list[str | None] = []
+        for index, (recipient, subject, body) in enumerate(messages):
+            try:
+                self.smtp.send(EMAIL_FROM, recipient, subject, body)
+                results.append(None)
+            except MESSAGE_ERRORS as e:
+                results.append(str(e))
+            except (smtplib.SMTPException, OSError) as e:
+                # Lỗi kết nối: bỏ qua phần còn lại của batch, các email này sẽ được thử lại sau
+                self.smtp.close()
+                results.extend([f"{type(e).__name__}: {e}"] * (len(messages) - index))
+                break
+        return results
+
+    async def send_pending(self) -> int:
+        """Gửi một batch email đến hạn. Trả về số email đã nhận xử lý."""
+        # Lease đủ dài để gửi xong cả batch trước khi worker khác có thể nhận lại
+        lease_seconds = settings.SMTP_TIMEOUT * (self.batch_size + 2)
+
+        async with AsyncSessionLocal() as db:
+            messages = await claim_due_emails(db, self.batch_size, lease_seconds)
+            if not messages:
+                return 0
+
+            results = await asyncio.to_thread(
+                self._send_batch, [(m.recipient, m.subject, m.body) for m in messages]
+            )
+            for message, error in zip(messages, results):
+                if error is None:
+                    mark_email_sent(message)
+                else:
+                    print(f"ERROR: Failed to send email {message.id} (attempt {message.attempts}): {error}")
+                    mark_email_failed(message, error, self._retry_at(message.attempts))
+            db.add_all(messages)
+            await db.commit()
+            return len(messages)
+
+
+email_sender = EmailSender(
+    smtp=create_smtp_session(),
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+)
@@ -1,11 +1,15 @@
 import os
 from datetime import datetime
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from modules.auth_modules.auth_crud import get_user_by_username, create_user
 from modules.auth_modules.auth_schemas import CreateUserRequest
-from database import AsyncSessionLocal
+from database import AsyncSessionLocal, async_engine
 from config import settings
 
+# Khoá advisory của Postgres dùng chung cho mọi worker/instance khi chạy tác vụ khởi động
+STARTUP_LOCK_ID = 7_310_001
+
 
 async def seed_initial_admin_user():
     async with AsyncSessionLocal() as session:
@@ -35,3 +39,28 @@ async def seed_initial_admin_user():
         else:
             print(f"INFO: Admin user '{admin_username}' already exists. Skipping creation.")
 
+
+
+async def run_startup_tasks():
+    """
+    Chạy các tác vụ khởi động (seed admin) đúng một lần khi nhiều worker cùng khởi động.
+    Trên Postgres, worker giữ được advisory lock sẽ chạy; các worker khác chờ nó xong rồi bỏ qua,
+    nên không worker nào nhận request trước khi dữ liệu khởi tạo sẵn sàng.
+    """
+    if async_engine.dialect.name != "postgresql":
+        await seed_initial_admin_user()
+        return
+
+    # Kết nối riêng, dùng autocommit để lock (cấp session) không giữ transaction mở trong lúc chờ
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": STARTUP_LOCK_ID})
+        if not acquired:
+            print("INFO: Startup tasks are running in another worker. Waiting for them to finish.")
+            await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": STARTUP_LOCK_ID})
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": STARTUP_LOCK_ID})
+            return
+        try:
+            await seed_initial_admin_user()
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": STARTUP_LOCK_ID})
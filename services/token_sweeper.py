@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime
+
+from config import settings
+from database import AsyncSessionLocal
+from modules.auth_modules.auth_crud import delete_expired_password_reset_tokens, PASSWORD_RESET_TOKEN_TTL
+from modules.email_modules.email_crud import delete_finished_emails
+
+
+class PasswordResetTokenSweeper:
+    """
+    Worker nền định kỳ xoá token đặt lại mật khẩu đã hết hạn, theo từng batch nhỏ
+    (mỗi batch một transaction ngắn) để không khoá bảng lâu. Token hết hạn mà chưa bị xoá
+    vẫn bị /auth/reset-password từ chối, worker này chỉ giữ cho bảng và index không phình ra.
+
+    Email đã gửi/bỏ cuộc trong outbox cũng bị xoá sau PASSWORD_RESET_TOKEN_TTL: phòng trường hợp nội dung
+    (link chứa token dạng rõ) còn sót lại, sau thời gian này token trong đó chắc chắn đã hết hạn.
+    """
+
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                deleted = await self.sweep()
+                if deleted:
+                    print(f"INFO: Deleted {deleted} expired password reset tokens.")
+                deleted = await self.sweep_outbox()
+                if deleted:
+                    print(f"INFO: Deleted {deleted} finished outbox emails.")
+            except Exception as e:
+                print(f"ERROR: Password reset token sweeper failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        """Xoá hết token đã hết hạn. Trả về tổng số token đã xoá."""
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                deleted = await delete_expired_password_reset_tokens(db, self.batch_size)
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+            await asyncio.sleep(0)  # Nhường event loop giữa các batch
+
+    async def sweep_outbox(self) -> int:
+        """Xoá hết email đã gửi/bỏ cuộc quá PASSWORD_RESET_TOKEN_TTL. Trả về tổng số email đã xoá."""
+        older_than = datetime.utcnow() - PASSWORD_RESET_TOKEN_TTL
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                deleted = await delete_finished_emails(db, older_than, self.batch_size)
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+            await asyncio.sleep(0)
+
+
+token_sweeper = PasswordResetTokenSweeper(
+    batch_size=settings.PASSWORD_RESET_TOKEN_SWEEP_BATCH_SIZE,
+    interval=settings.PASSWORD_RESET_TOKEN_SWEEP_INTERVAL,
+)
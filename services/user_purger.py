@@ -0,0 +1,80 @@
+import asyncio
+
+from config import settings
+from database import AsyncSessionLocal
+from modules.auth_modules.auth_crud import get_users_pending_deletion, delete_user_pending_deletion
+from modules.todos_modules.todo_crud import delete_todos_of_deleted_owner
+
+
+class UserPurger:
+    """
+    Worker nền xoá người dùng mà admin đã xoá (auth_crud.delete_user_by_admin chỉ khoá tài khoản):
+    xoá todos theo từng batch nhỏ (mỗi batch một transaction ngắn, không khoá bảng lâu
+    và không nạp todos vào bộ nhớ), sau đó xoá người dùng. Danh sách chờ xoá nằm trong bảng users
+    nên việc xoá dở dang được tiếp tục sau khi khởi động lại.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Báo cho worker có người dùng mới chờ xoá để xử lý ngay thay vì chờ lần poll kế tiếp."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                purged = await self.purge_pending()
+                if purged:
+                    print(f"INFO: Deleted {purged} users pending deletion.")
+            except Exception as e:
+                print(f"ERROR: User purger failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def purge_pending(self) -> int:
+        """Xoá hết người dùng đang chờ xoá. Trả về số người dùng đã xoá."""
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                user_ids = await get_users_pending_deletion(db, self.batch_size)
+            for user_id in user_ids:
+                if await self.purge_user(user_id):
+                    total += 1
+            if len(user_ids) < self.batch_size:
+                return total
+
+    async def purge_user(self, user_id: int) -> bool:
+        while True:
+            async with AsyncSessionLocal() as db:
+                deleted = await delete_todos_of_deleted_owner(db, user_id, self.batch_size)
+            if deleted == 0:
+                break
+            await asyncio.sleep(0)  # Nhường event loop giữa các batch
+        async with AsyncSessionLocal() as db:
+            return await delete_user_pending_deletion(db, user_id)
+
+
+user_purger = UserPurger(
+    batch_size=settings.USER_PURGE_BATCH_SIZE,
+    poll_interval=settings.USER_PURGE_POLL_INTERVAL,
+)
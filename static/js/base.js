@@ -379,3 +379,163 @@ if (changePasswordForm) {
         }
     });
 }
+
+// Todo List Live Updates JS
+// Nhận sự kiện created/updated/deleted từ /todos/stream (Server-Sent Events) và cập nhật bảng tại chỗ
+const todoTable = document.getElementById('todoTable');
+if (todoTable && window.EventSource) {
+    const todoTableBody = todoTable.querySelector('tbody');
+    const noTodosAlert = document.getElementById('noTodosAlert');
+    const TODO_PAGE_SIZE = 100;
+    // Bộ lọc của trang (complete, priority, priority_min, priority_max), cùng tên tham số với GET /todos/
+    const todoFilters = new URLSearchParams(todoTable.dataset.filters);
+    const todoSort = todoTable.dataset.sort;
+
+    function todoMatchesFilters(todo) {
+        const complete = todoFilters.get('complete');
+        if (complete !== null && String(todo.complete) !== complete) {
+            return false;
+        }
+        const priority = todoFilters.get('priority');
+        if (priority !== null && todo.priority !== Number(priority)) {
+            return false;
+        }
+        const priorityMin = todoFilters.get('priority_min');
+        if (priorityMin !== null && !(todo.priority >= Number(priorityMin))) {
+            return false;
+        }
+        const priorityMax = todoFilters.get('priority_max');
+        if (priorityMax !== null && !(todo.priority <= Number(priorityMax))) {
+            return false;
+        }
+        return true;
+    }
+
+    function renumberTodoRows() {
+        const rows = todoTableBody.querySelectorAll('tr');
+        rows.forEach((row, index) => {
+            row.cells[0].textContent = index + 1;
+        });
+        if (noTodosAlert) {
+            noTodosAlert.style.display = rows.length ? 'none' : '';
+        }
+    }
+
+    function fillTodoRow(row, todo) {
+        row.replaceChildren();
+        row.dataset.todoId = todo.id;
+
+        row.insertCell().textContent = '';
+
+        const titleCell = row.insertCell();
+        titleCell.textContent = todo.title;
+        if (todo.complete) {
+            titleCell.className = 'strike-through-td';
+        }
+
+        row.insertCell().textContent = todo.priority;
+
+        const badge = document.createElement('span');
+        badge.className = todo.complete ? 'badge bg-success' : 'badge bg-warning text-dark';
+        badge.textContent = todo.complete ? 'Yes' : 'No';
+        row.insertCell().appendChild(badge);
+
+        const editButton = document.createElement('button');
+        editButton.type = 'button';
+        editButton.className = 'btn btn-info';
+        editButton.textContent = 'Edit';
+        editButton.addEventListener('click', () => {
+            window.location.href = `/todos/edit-todo-page/${todo.id}`;
+        });
+        row.insertCell().appendChild(editButton);
+    }
+
+    function findTodoRow(todoId) {
+        return todoTableBody.querySelector(`tr[data-todo-id="${todoId}"]`);
+    }
+
+    // Tải lại trang hiện tại qua API (không reload cả trang), dùng khi có thể đã bỏ lỡ sự kiện
+    async function refreshTodoTable() {
+        const token = getCookie('access_token');
+        if (!token) {
+            return;
+        }
+        const params = new URLSearchParams(todoFilters);
+        params.set('sort', todoSort);
+        params.set('limit', TODO_PAGE_SIZE);
+        if (todoTable.dataset.cursor) {
+            params.set('cursor', todoTable.dataset.cursor);
+        }
+        try {
+            const response = await fetch(`/todos/?${params}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) {
+                return;
+            }
+            const data = await response.json();
+            todoTableBody.replaceChildren();
+            for (const todo of data.todos) {
+                fillTodoRow(todoTableBody.insertRow(), todo);
+            }
+            todoTable.dataset.hasNext = data.next_cursor ? 'true' : 'false';
+            renumberTodoRows();
+        } catch (error) {
+            console.error('Error refreshing todos:', error);
+        }
+    }
+
+    function applyTodoEvent(event) {
+        const row = findTodoRow(event.id);
+        if (event.type === 'deleted') {
+            if (row) {
+                row.remove();
+            }
+        } else if (!event.todo) {
+            // Sự kiện quá lớn nên không kèm dữ liệu
+            refreshTodoTable();
+            return;
+        } else if (!todoMatchesFilters(event.todo)) {
+            // Todo không (còn) khớp bộ lọc của trang
+            if (row) {
+                row.remove();
+            }
+        } else if (row && todoSort.endsWith('priority') && row.cells[2].textContent !== String(event.todo.priority)) {
+            // Sắp xếp theo priority và priority đã đổi: vị trí của todo đổi theo, tải lại trang
+            refreshTodoTable();
+            return;
+        } else if (row) {
+            fillTodoRow(row, event.todo);
+        } else if (event.type === 'created') {
+            if (todoSort === 'id') {
+                // Todo mới chỉ thuộc trang này nếu đây là trang cuối
+                if (todoTable.dataset.hasNext !== 'true') {
+                    fillTodoRow(todoTableBody.insertRow(), event.todo);
+                }
+            } else if (todoSort !== '-id' || !todoTable.dataset.cursor) {
+                // Sort -id: todo mới ở đầu trang đầu tiên; sort priority: có thể ở bất kỳ đâu trong trang
+                refreshTodoTable();
+                return;
+            }
+        } else if (todoFilters.toString() !== '') {
+            // Todo vừa được sửa để khớp bộ lọc có thể thuộc trang này
+            refreshTodoTable();
+            return;
+        }
+        renumberTodoRows();
+    }
+
+    let todoStreamConnected = false;
+    const todoStream = new EventSource('/todos/stream');
+    todoStream.addEventListener('open', () => {
+        // Server đóng stream định kỳ; sau khi kết nối lại thì đồng bộ những gì có thể đã lỡ
+        if (todoStreamConnected) {
+            refreshTodoTable();
+        }
+        todoStreamConnected = true;
+    });
+    for (const type of ['created', 'updated', 'deleted']) {
+        todoStream.addEventListener(type, (message) => applyTodoEvent(JSON.parse(message.data)));
+    }
+    todoStream.addEventListener('reset', refreshTodoTable);
+}
@@ -0,0 +1,90 @@
+import itertools
+import os
+import tempfile
+
+# Cấu hình cho test phải có trước khi import app (config.settings đọc biến môi trường khi import)
+_TEST_DIR = tempfile.mkdtemp(prefix="todos-tests-")
+os.environ.update({
+    "ENVIRONMENT": "LOCAL",
+    "SECRET_KEY": "test-secret-key",
+    "EMAIL_ADDRESS": "noreply@example.com",
+    "EMAIL_PASSWORD": "-",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "25",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_TEST_DIR}/test.db",
+    "DATABASE_REPLICA_URLS": "[]",
+    "CACHE_BACKEND": "memory",
+    "RATE_LIMIT_ENABLED": "false",
+    "EMAIL_SENDER_ENABLED": "false",
+    "METRICS_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",
+    "DEFAULT_ADMIN_USERNAME": "admin",
+    "DEFAULT_ADMIN_EMAIL": "admin@example.com",
+    "DEFAULT_ADMIN_FIRST_NAME": "Admin",
+    "DEFAULT_ADMIN_LAST_NAME": "Admin",
+    "DEFAULT_ADMIN_PASSWORD": "adminpass",
+    "DEFAULT_ADMIN_PHONE_NUMBER": "0",
+})
+
+import httpx
+import pytest
+
+from database import Base, async_engine
+from main import app
+from modules.auth_modules.auth_utils import decode_access_token
+from services.initial_setup import seed_initial_admin_user
+
+# Mọi test dùng chung một database; mỗi test tạo người dùng riêng nên dữ liệu không lẫn nhau
+_user_numbers = itertools.count(1)
+
+TODO = {"title": "Test todo", "description": "Test description", "priority": 3, "complete": False}
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def database(anyio_backend):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_initial_admin_user()
+    yield
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(database):
+    # raise_app_exceptions=False: lỗi trong handler trả về 500 như khi chạy thật, test kiểm tra status code
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/auth/token", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    token = response.json()["access_token"]
+    return {"id": decode_access_token(token)["id"], "headers": {"Authorization": f"Bearer {token}"}}
+
+
+async def register(client: httpx.AsyncClient) -> dict:
+    """Tạo người dùng mới và đăng nhập; trả về {'id': ..., 'headers': ...}."""
+    username = f"user{next(_user_numbers)}"
+    response = await client.post("/auth/", json={
+        "username": username, "email": f"{username}@example.com", "first_name": "Test", "last_name": "User",
+        "password": "password1", "phone_number": "0",
+    })
+    assert response.status_code == 201, response.text
+    return await login(client, username, "password1")
+
+
+@pytest.fixture
+async def user(client):
+    return await register(client)
+
+
+@pytest.fixture
+async def admin(client):
+    return await login(client, "admin", "adminpass")
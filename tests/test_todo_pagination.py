@@ -0,0 +1,87 @@
+import base64
+import json
+
+import pytest
+
+from conftest import TODO
+
+
+def forge_cursor(sort: str, keys) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"s": sort, "k": keys}).encode()).decode().rstrip("=")
+
+
+async def read_all_pages(client, headers: dict, **params) -> list[dict]:
+    todos, cursor = [], None
+    while True:
+        response = await client.get("/todos/", headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        todos += data["todos"]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return todos
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sort", ["id", "-id", "priority", "-priority"])
+async def test_cursor_round_trip(client, user, sort):
+    for priority in (3, 1, 5, 1, 2, 5, 3):
+        response = await client.post("/todos/todo", headers=user["headers"], json={**TODO, "priority": priority})
+        assert response.status_code == 201
+
+    todos = await read_all_pages(client, user["headers"], sort=sort, limit=3)
+
+    key = (lambda todo: (todo["priority"], todo["id"])) if sort.endswith("priority") else (lambda todo: todo["id"])
+    assert len(todos) == 7
+    assert [todo["id"] for todo in todos] == [todo["id"] for todo in sorted(todos, key=key,
+                                                                           reverse=sort.startswith("-"))]
+
+
+@pytest.mark.anyio
+async def test_cursor_keeps_filters(client, user):
+    for priority in range(1, 6):
+        for complete in (False, True):
+            await client.post("/todos/todo", headers=user["headers"],
+                              json={**TODO, "priority": priority, "complete": complete})
+
+    todos = await read_all_pages(client, user["headers"], sort="priority", limit=2,
+                                 complete="true", priority_min=2, priority_max=4)
+
+    assert [(todo["priority"], todo["complete"]) for todo in todos] == [(2, True), (3, True), (4, True)]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    forge_cursor("-id", [1]),         # Cursor của kiểu sắp xếp khác
+    forge_cursor("id", ["1"]),
+    forge_cursor("id", [True]),
+    forge_cursor("id", [1.5]),
+    forge_cursor("id", [None]),
+    forge_cursor("id", [2 ** 40]),    # Ngoài khoảng của cột Integer
+    forge_cursor("id", [1, 2]),
+    forge_cursor("id", {"k": 1}),
+])
+async def test_forged_cursor_is_rejected(client, user, cursor):
+    response = await client.get("/todos/", headers=user["headers"], params={"sort": "id", "cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor."}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("keys", [["rank", 1], [0.5, "1"], [0.5]])
+async def test_forged_search_cursor_is_rejected(client, user, keys):
+    response = await client.get("/todos/search", headers=user["headers"],
+                                params={"q": "test", "cursor": forge_cursor("search", keys)})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("keys", [["1"], [1.0], []])
+async def test_forged_user_list_cursor_is_rejected(client, admin, keys):
+    response = await client.get("/admin/users", headers=admin["headers"],
+                                params={"cursor": forge_cursor("users", keys)})
+
+    assert response.status_code == 400
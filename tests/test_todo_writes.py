@@ -0,0 +1,132 @@
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import select
+
+from conftest import TODO, register
+from database import AsyncSessionLocal
+from models import Todos, TodoStats
+from modules.todos_modules.todo_crud import TODO_STATS_COUNTS, delete_existing_todo, update_existing_todo
+from modules.todos_modules.todo_schemas import TodoRequest
+
+
+async def create_todos(client, user: dict, count: int) -> list[int]:
+    response = await client.post("/todos/batch", headers=user["headers"], json={"operations": [
+        {"op": "create", "todo": {**TODO, "priority": index % 5 + 1}} for index in range(count)
+    ]})
+    assert response.status_code == 200, response.text
+    return [result["id"] for result in response.json()["results"]]
+
+
+async def assert_stats_match_todos(owner_id: int):
+    async with AsyncSessionLocal() as db:
+        counts = (await db.execute(
+            select(*TODO_STATS_COUNTS.values()).filter(Todos.owner_id == owner_id)
+        )).one()
+        stats = await db.get(TodoStats, owner_id)
+    assert tuple(getattr(stats, name) for name in TODO_STATS_COUNTS) == tuple(counts)
+
+
+@pytest.mark.anyio
+async def test_batch_only_touches_own_todos(client, user):
+    other = await register(client)
+    [own_id] = await create_todos(client, user, 1)
+    [other_id] = await create_todos(client, other, 1)
+
+    response = await client.post("/todos/batch", headers=user["headers"], json={"operations": [
+        {"op": "update", "id": own_id, "todo": {**TODO, "title": "Updated todo"}},
+        {"op": "update", "id": other_id, "todo": {**TODO, "title": "Hijacked todo"}},
+        {"op": "delete", "id": other_id + 1000},
+        {"op": "create", "todo": TODO},
+    ]})
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == ["updated", "not_found",
+                                                                          "not_found", "created"]
+    response = await client.get(f"/todos/todo/{other_id}", headers=other["headers"])
+    assert response.json()["title"] == TODO["title"]
+    response = await client.delete(f"/todos/todo/{other_id}", headers=user["headers"])
+    assert response.status_code == 404
+    await assert_stats_match_todos(user["id"])
+    await assert_stats_match_todos(other["id"])
+
+
+@pytest.mark.anyio
+async def test_batch_rejects_repeated_todo(client, user):
+    [todo_id] = await create_todos(client, user, 1)
+
+    response = await client.post("/todos/batch", headers=user["headers"], json={"operations": [
+        {"op": "update", "id": todo_id, "todo": TODO},
+        {"op": "delete", "id": todo_id},
+    ]})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_stats_match_counts_after_concurrent_writes(client, user):
+    rng = random.Random(1)
+    todo_ids = await create_todos(client, user, 40)
+
+    def random_todo() -> dict:
+        return {**TODO, "priority": rng.randint(1, 5), "complete": rng.random() < 0.5}
+
+    requests = []
+    for todo_id in todo_ids:
+        requests.append(client.put(f"/todos/todo/{todo_id}", headers=user["headers"], json=random_todo()))
+        if rng.random() < 0.5:
+            requests.append(client.delete(f"/todos/todo/{todo_id}", headers=user["headers"]))
+    for _ in range(10):
+        sample = rng.sample(todo_ids, 3)
+        requests.append(client.post("/todos/batch", headers=user["headers"], json={"operations": [
+            {"op": "create", "todo": random_todo()},
+            {"op": "update", "id": sample[0], "todo": random_todo()},
+            {"op": "delete", "id": sample[1]},
+            {"op": "update", "id": sample[2], "todo": random_todo()},
+        ]}))
+    rng.shuffle(requests)
+    responses = await asyncio.gather(*requests)
+
+    assert {response.status_code for response in responses} <= {200, 204, 404}
+    await assert_stats_match_todos(user["id"])
+
+
+@pytest.mark.anyio
+async def test_concurrent_update_and_delete_never_fail(client, user):
+    todo_ids = await create_todos(client, user, 20)
+
+    responses = await asyncio.gather(*(
+        request
+        for todo_id in todo_ids
+        for request in (client.put(f"/todos/todo/{todo_id}", headers=user["headers"], json={**TODO, "complete": True}),
+                        client.delete(f"/todos/todo/{todo_id}", headers=user["headers"]))
+    ))
+
+    assert {response.status_code for response in responses} <= {204, 404}
+    response = await client.get("/todos/", headers=user["headers"])
+    assert response.json()["todos"] == []
+    await assert_stats_match_todos(user["id"])
+
+
+@pytest.mark.anyio
+async def test_update_of_todo_deleted_between_statements_returns_404(client, user):
+    [todo_id] = await create_todos(client, user, 1)
+
+    # Xoá todo ngay sau câu lệnh đầu tiên của lần cập nhật (đọc giá trị cũ trên SQLite)
+    async with AsyncSessionLocal() as db:
+        execute = db.execute
+
+        async def execute_then_delete(*args, **kwargs):
+            result = await execute(*args, **kwargs)
+            db.execute = execute
+            async with AsyncSessionLocal() as other_db:
+                assert await delete_existing_todo(other_db, todo_id, user["id"]) == todo_id
+            return result
+
+        db.execute = execute_then_delete
+        assert await update_existing_todo(db, todo_id, user["id"], TodoRequest(**TODO)) is None
+
+    response = await client.put(f"/todos/todo/{todo_id}", headers=user["headers"], json=TODO)
+    assert response.status_code == 404
+    await assert_stats_match_todos(user["id"])